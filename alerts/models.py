@@ -6,6 +6,7 @@ class Alert(models.Model):
     number_plate = models.CharField(max_length=20)
     description = models.TextField()
     status = models.CharField(max_length=20, default='unresolved')
+    event_id = models.CharField(max_length=64, null=True, blank=True, unique=True)  # ingestion event that raised the alert
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
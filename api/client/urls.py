@@ -1,7 +1,9 @@
 from django.urls import path
 from .views import (
     ClientDashboardAPIView, ClientLocationsAPIView, ClientLocationDetailAPIView, ClientCurrentParkingAPIView,
-    ClientParkingHistoryAPIView, ClientFinancialReportsAPIView, ClientAnalyticsAPIView, ClientStaffAPIView,
+    ClientFeePreviewAPIView,
+    ClientParkingHistoryAPIView, ClientFinancialReportsAPIView, ClientAnalyticsAPIView, ClientOccupancyAnalyticsAPIView, ClientDwellAnalyticsAPIView,
+    ClientStaffAPIView,
     ClientStaffDetailAPIView, ClientNotificationsAPIView, ClientSettingsAPIView, ClientSupportFAQsAPIView,
     ClientSupportTicketsAPIView
 )
@@ -11,9 +13,12 @@ urlpatterns = [
     path('locations/', ClientLocationsAPIView.as_view(), name='client-locations'),
     path('locations/<int:location_id>/', ClientLocationDetailAPIView.as_view(), name='client-location-detail'),
     path('parking/current/', ClientCurrentParkingAPIView.as_view(), name='client-current-parking'),
+    path('parking/fees/', ClientFeePreviewAPIView.as_view(), name='client-fee-preview'),
     path('parking/history/', ClientParkingHistoryAPIView.as_view(), name='client-parking-history'),
     path('financial/reports/', ClientFinancialReportsAPIView.as_view(), name='client-financial-reports'),
     path('analytics/', ClientAnalyticsAPIView.as_view(), name='client-analytics'),
+    path('analytics/occupancy/', ClientOccupancyAnalyticsAPIView.as_view(), name='client-occupancy-analytics'),
+    path('analytics/dwell/', ClientDwellAnalyticsAPIView.as_view(), name='client-dwell-analytics'),
     path('staff/', ClientStaffAPIView.as_view(), name='client-staff'),
     path('staff/<int:staff_id>/', ClientStaffDetailAPIView.as_view(), name='client-staff-detail'),
     path('notifications/', ClientNotificationsAPIView.as_view(), name='client-notifications'),
@@ -3,8 +3,16 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, BasePermission
 from parking_lots.models import ParkingLot, ParkingSpace
 from parking_transactions.models import ParkingTransaction
+from parking_transactions.models import DailyRevenueRollup, HourlyOccupancy
+from parking_transactions.dwell import dwell_report
+from parking_transactions.kpis import client_scope, kpi_snapshot
+from parking_transactions.occupancy_history import local_midnight
+from parking_transactions.rollups import parse_report_range, revenue_series
+from parking_transactions.tariffs import evaluate_fees
 from api.serializers import ParkingLotSerializer, ParkingTransactionSerializer
-from django.db.models import Sum, Count, Q
+from decimal import Decimal
+from django.db.models import Sum, Count, Q, DecimalField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from rest_framework import status
 from datetime import datetime, timedelta
 from alerts.models import Alert
@@ -13,6 +21,7 @@ from django.contrib.auth import get_user_model
 from api.models import SupportTicket
 from api.serializers import SupportTicketSerializer
 from django.shortcuts import get_object_or_404
+from api.pagination import AnalyticsPagination, sort_queryset
 
 
 User = get_user_model()
@@ -27,44 +36,54 @@ class ClientDashboardAPIView(APIView):
 
     def get(self, request):
         location_id = request.query_params.get('location_id')
-        
-        # Filter parking lots owned by this client
-        lots = ParkingLot.objects.filter(client=request.user)
         if location_id:
-            lots = lots.filter(id=location_id)
+            try:
+                location_id = int(location_id)
+            except ValueError:
+                return Response({'status': 'error', 'message': 'location_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            location_id = None
 
-        lot_ids = lots.values_list('id', flat=True)
+        snapshot = kpi_snapshot(
+            client_scope(request.user.id, location_id),
+            lambda: self.build_snapshot(request.user, location_id),
+        )
+        return Response({
+            # **NEW**: Include user details
+            'user': UserSerializer(request.user).data,
+            **snapshot,
+        })
 
-        # Spaces and transactions for these lots
-        spaces = ParkingSpace.objects.filter(parking_lot__in=lot_ids)
-        transactions = ParkingTransaction.objects.filter(parking_space__parking_lot__in=lot_ids)
+    @staticmethod
+    def build_snapshot(client, location_id=None):
+        # Filter parking lots owned by this client
+        lots = ParkingLot.objects.filter(client=client).select_related('client')
+        rollups = DailyRevenueRollup.objects.filter(client=client)
+        if location_id is not None:
+            lots = lots.filter(id=location_id)
+            rollups = rollups.filter(parking_lot_id=location_id)
+        lots = list(lots)
 
-        # KPIs
-        now_parked = spaces.filter(is_occupied=True).count()
-        total_spaces = spaces.count()
-        total_revenue = transactions.aggregate(total=Sum('fee'))['total'] or 0
+        # KPIs (occupancy from the per-lot counters, revenue from the daily rollup)
         kpis = {
-            'total_revenue': total_revenue,
-            'cars_parked_now': now_parked,
-            'total_spaces': total_spaces,
-            'locations_active': lots.count(),
+            'total_revenue': rollups.aggregate(total=Sum('revenue'))['total'] or 0,
+            'cars_parked_now': sum(lot.occupied_count for lot in lots),
+            'total_spaces': sum(lot.space_count for lot in lots),
+            'locations_active': len(lots),
         }
 
         # Recent transactions (limit 10)
+        transactions = ParkingTransaction.objects.filter(parking_space__parking_lot__in=[lot.id for lot in lots])
         recent_transactions = ParkingTransactionSerializer(
             transactions.order_by('-created_at')[:10],
             many=True
         ).data
 
-        # **NEW**: Include user details
-        user_data = UserSerializer(request.user).data
-
-        return Response({
-            'user': user_data,
+        return {
             'kpis': kpis,
             'recent_transactions': recent_transactions,
             'locations': ParkingLotSerializer(lots, many=True).data,
-        })
+        }
 
 # 2. Locations Management
 class ClientLocationsAPIView(APIView):
@@ -112,8 +131,8 @@ class ClientCurrentParkingAPIView(APIView):
         lots = ParkingLot.objects.filter(client=request.user)
         if location_id:
             lots = lots.filter(id=location_id)
-        spaces = ParkingSpace.objects.filter(parking_lot__in=lots)
-        occupied = spaces.filter(is_occupied=True)
+        occupancy = lots.aggregate(occupied=Sum('occupied_count'), spaces=Sum('space_count'))
+        occupied = ParkingSpace.objects.filter(parking_lot__in=lots, is_occupied=True).select_related('parking_lot')
         data = [
             {
                 'space_number': s.space_number,
@@ -122,8 +141,43 @@ class ClientCurrentParkingAPIView(APIView):
             } for s in occupied
         ]
         return Response({
-            'occupied_spaces': len(data),
-            'free_spaces': spaces.count() - len(data),
+            'occupied_spaces': occupancy['occupied'] or 0,
+            'free_spaces': (occupancy['spaces'] or 0) - (occupancy['occupied'] or 0),
+            'details': data,
+        })
+
+# Fee preview for sessions still in progress
+class ClientFeePreviewAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsClientPermission]
+    def get(self, request):
+        location_id = request.query_params.get('location_id')
+        lots = ParkingLot.objects.filter(client=request.user)
+        if location_id:
+            try:
+                location_id = int(location_id)
+            except ValueError:
+                return Response({'status': 'error', 'message': 'location_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            lots = lots.filter(id=location_id)
+        sessions = ParkingTransaction.objects.filter(
+            parking_space__parking_lot__in=lots, status='ongoing'
+        ).values_list('id', 'parking_space__parking_lot_id', 'entry_time', 'exit_time', 'car__number_plate')
+        plates = {}
+        rows = []
+        for session_id, lot_id, entry_time, exit_time, number_plate in sessions:
+            plates[session_id] = (number_plate, entry_time)
+            rows.append((session_id, lot_id, entry_time, exit_time))
+        fees = evaluate_fees(rows)
+        data = [
+            {
+                'transaction_id': session_id,
+                'number_plate': plates[session_id][0],
+                'entry_time': plates[session_id][1],
+                'accrued_fee': fee,
+            } for session_id, fee in fees.items()
+        ]
+        return Response({
+            'sessions': len(data),
+            'total_accrued': sum(fees.values()),
             'details': data,
         })
 
@@ -148,35 +202,88 @@ class ClientParkingHistoryAPIView(APIView):
 
 # 5. Financial Reports / Transactions
 class ClientFinancialReportsAPIView(APIView):
+    """Revenue per day, week or month (?granularity=) between ?start= and ?end= (default: last 30 days)."""
     permission_classes = [IsAuthenticated, IsClientPermission]
     def get(self, request):
-        lots = ParkingLot.objects.filter(client=request.user)
-        lot_ids = lots.values_list('id', flat=True)
-        transactions = ParkingTransaction.objects.filter(parking_space__parking_lot__in=lot_ids)
-        # Revenue by day for last 30 days
-        today = datetime.today().date()
-        days = [today - timedelta(days=i) for i in range(30)]
-        revenue_by_day = []
-        for day in days:
-            total = transactions.filter(created_at__date=day).aggregate(total=Sum('fee'))['total'] or 0
-            revenue_by_day.append({'date': day, 'revenue': total})
-        return Response({'revenue_by_day': revenue_by_day})
+        try:
+            start, end, granularity = parse_report_range(request.query_params)
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        rollups = DailyRevenueRollup.objects.filter(client=request.user)
+        return Response({f'revenue_by_{granularity}': revenue_series(rollups, start, end, granularity)})
+
+class ClientOccupancyAnalyticsAPIView(APIView):
+    """Hourly occupancy, utilization and turnover per lot between ?start= and ?end= (default: last 7 days)."""
+    permission_classes = [IsAuthenticated, IsClientPermission]
+    def get(self, request):
+        try:
+            start, end, _ = parse_report_range(request.query_params, default_days=7)
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        hours = HourlyOccupancy.objects.filter(
+            parking_lot__client=request.user,
+            hour__gte=local_midnight(start), hour__lt=local_midnight(end + timedelta(days=1)),
+        )
+        location_id = request.query_params.get('location_id')
+        if location_id:
+            if not location_id.isdigit():
+                return Response({'status': 'error', 'message': 'location_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            hours = hours.filter(parking_lot_id=location_id)
+        return Response({'hourly_occupancy': list(hours.order_by('parking_lot_id', 'hour').values(
+            'parking_lot_id', 'hour', 'spaces', 'average_occupancy', 'peak_occupancy',
+            'utilization', 'entries', 'exits', 'turnover',
+        ))})
+
+class ClientDwellAnalyticsAPIView(APIView):
+    """Dwell-time histograms and p50/p90/p99 per lot, weekday and hour of entry between ?start= and ?end= (default: last 30 days)."""
+    permission_classes = [IsAuthenticated, IsClientPermission]
+    def get(self, request):
+        try:
+            start, end, _ = parse_report_range(request.query_params)
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        sessions = ParkingTransaction.objects.filter(parking_space__parking_lot__client=request.user)
+        scope = f'client:{request.user.id}'
+        location_id = request.query_params.get('location_id')
+        if location_id:
+            if not location_id.isdigit():
+                return Response({'status': 'error', 'message': 'location_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            sessions = sessions.filter(parking_space__parking_lot_id=location_id)
+            scope = f'{scope}:lot:{location_id}'
+        return Response(dwell_report(sessions, start, end, scope))
 
 # 6. Analytics & Insights
 class ClientAnalyticsAPIView(APIView):
     permission_classes = [IsAuthenticated, IsClientPermission]
     def get(self, request):
-        lots = ParkingLot.objects.filter(client=request.user)
-        analytics = []
-        for lot in lots:
-            revenue = ParkingTransaction.objects.filter(parking_space__parking_lot=lot).aggregate(total=Sum('fee'))['total'] or 0
-            sessions = ParkingTransaction.objects.filter(parking_space__parking_lot=lot).count()
-            analytics.append({
+        """Revenue and completed sessions per lot, ?sort=revenue|sessions|name (default -revenue); ?page= to page."""
+        rollups = DailyRevenueRollup.objects.filter(parking_lot=OuterRef('pk')).values('parking_lot')
+        lots = ParkingLot.objects.filter(client=request.user).select_related('client').annotate(
+            revenue=Coalesce(
+                Subquery(rollups.annotate(total=Sum('revenue')).values('total')),
+                Value(Decimal('0.00')), output_field=DecimalField(max_digits=14, decimal_places=2)
+            ),
+            sessions=Coalesce(Subquery(rollups.annotate(total=Sum('sessions')).values('total')), Value(0)),
+        )
+        lots = sort_queryset(lots, request, {'revenue', 'sessions', 'name'}, '-revenue')
+        paginator = AnalyticsPagination()
+        page = paginator.paginate_queryset(lots, request, view=self)
+        analytics = [
+            {
                 'location': ParkingLotSerializer(lot).data,
-                'revenue': revenue,
-                'sessions': sessions,
-            })
-        return Response({'location_performance': analytics})
+                'revenue': lot.revenue,
+                'sessions': lot.sessions,
+            } for lot in (lots if page is None else page)
+        ]
+        body = {'location_performance': analytics}
+        if page is not None:
+            body = {
+                'count': paginator.page.paginator.count,
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
+                **body,
+            }
+        return Response(body)
 
 # 7. Staff Management
 class ClientStaffAPIView(APIView):
@@ -2,8 +2,9 @@ from django.urls import path
 from .views import (
     CompanyDashboardAPIView, CompanyClientsAPIView, CompanyClientDetailAPIView, CompanyLocationsAPIView, CompanyLocationDetailAPIView,
     CompanyUsersAPIView, CompanyUserDetailAPIView, CompanyStaffAPIView, CompanyStaffDetailAPIView, CompanyParkingSessionsAPIView,
-    CompanyParkingHistoryAPIView, CompanyFinancialTransactionsAPIView, CompanyAnalyticsAPIView, CompanyNotificationsAPIView,
-    CompanySettingsAPIView, CompanySupportAPIView, DriverDetailsView
+    CompanyParkingHistoryAPIView, CompanyFinancialTransactionsAPIView, CompanyAnalyticsAPIView, CompanyDwellAnalyticsAPIView,
+    CompanyNotificationsAPIView,
+    CompanySettingsAPIView, CompanySupportAPIView, DriverDetailsView, CompanyPaymentsMetricsAPIView
 )
 
 urlpatterns = [
@@ -20,8 +21,10 @@ urlpatterns = [
     path('parking-history/', CompanyParkingHistoryAPIView.as_view(), name='company-parking-history'),
     path('financial-transactions/', CompanyFinancialTransactionsAPIView.as_view(), name='company-financial-transactions'),
     path('analytics/', CompanyAnalyticsAPIView.as_view(), name='company-analytics'),
+    path('analytics/dwell/', CompanyDwellAnalyticsAPIView.as_view(), name='company-dwell-analytics'),
     path('notifications/', CompanyNotificationsAPIView.as_view(), name='company-notifications'),
     path('settings/', CompanySettingsAPIView.as_view(), name='company-settings'),
+    path('payments/metrics/', CompanyPaymentsMetricsAPIView.as_view(), name='company-payments-metrics'),
     path('support/', CompanySupportAPIView.as_view(), name='company-support'),
     path('user/<int:user_id>/driver/', DriverDetailsView.as_view(), name='driver-details'),
 
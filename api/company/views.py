@@ -4,9 +4,14 @@ from rest_framework.permissions import IsAuthenticated, BasePermission
 from rest_framework.renderers import JSONRenderer
 from users.models import User
 from parking_lots.models import ParkingLot, ParkingSpace
-from parking_transactions.models import ParkingTransaction
+from parking_transactions.models import DailyRevenueRollup, ParkingTransaction
+from parking_transactions.dwell import dwell_report
+from parking_transactions.kpis import COMPANY_SCOPE, kpi_snapshot
+from parking_transactions.rollups import parse_report_range, revenue_series
 from api.serializers import UserSerializer, ParkingLotSerializer, ParkingTransactionSerializer
-from django.db.models import Sum, Count
+from decimal import Decimal
+from django.db.models import Sum, Count, DecimalField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from rest_framework import status
 from datetime import datetime, timedelta
 from alerts.models import Alert
@@ -14,6 +19,20 @@ from api.serializers import AlertSerializer
 from api.models import SupportTicket
 from api.serializers import SupportTicketSerializer
 from django.shortcuts import get_object_or_404
+from api.pagination import AnalyticsPagination, sort_queryset
+from payments.client import metrics as payments_client_metrics
+
+
+def with_client_performance(clients):
+    """Annotate clients with revenue and completed sessions from the daily revenue rollup, one subquery each."""
+    rollups = DailyRevenueRollup.objects.filter(client=OuterRef('pk')).values('client')
+    return clients.annotate(
+        revenue=Coalesce(
+            Subquery(rollups.annotate(total=Sum('revenue')).values('total')),
+            Value(Decimal('0.00')), output_field=DecimalField(max_digits=14, decimal_places=2)
+        ),
+        sessions=Coalesce(Subquery(rollups.annotate(total=Sum('sessions')).values('total')), Value(0)),
+    )
 
 
 def is_company_admin(user):
@@ -28,49 +47,56 @@ class CompanyDashboardAPIView(APIView):
     permission_classes = [IsAuthenticated, IsCompanyAdmin]
     renderer_classes = [JSONRenderer]
     def get(self, request):
-        total_revenue = ParkingTransaction.objects.aggregate(total=Sum('fee'))['total'] or 0
-        total_users = User.objects.filter(is_email_verified=True, is_staff=False, role='driver').count()
-        total_clients = User.objects.filter(role='client').count()
-        total_locations = ParkingLot.objects.count()
-        active_sessions = ParkingTransaction.objects.filter(status='ongoing').count()
-        live_occupancy = ParkingSpace.objects.filter(is_occupied=True).count()
-        recent_transactions = ParkingTransactionSerializer(ParkingTransaction.objects.order_by('-created_at')[:10], many=True).data
-        kpis = {
-            'total_revenue': total_revenue,
-            'total_users': total_users,
-            'total_clients': total_clients,
-            'total_locations': total_locations,
-            'active_sessions': active_sessions,
-            'live_occupancy': live_occupancy,
-        }
-        response = Response({
-            'kpis': kpis,
-            'recent_transactions': recent_transactions,
-        })
+        response = Response(kpi_snapshot(COMPANY_SCOPE, self.build_snapshot))
         response.accepted_renderer = JSONRenderer()
         response.accepted_media_type = 'application/json'
         response.renderer_context = {}
         return response
 
+    @staticmethod
+    def build_snapshot():
+        lots = ParkingLot.objects.aggregate(total_locations=Count('id'), live_occupancy=Sum('occupied_count'))
+        kpis = {
+            'total_revenue': DailyRevenueRollup.objects.aggregate(total=Sum('revenue'))['total'] or 0,
+            'total_users': User.objects.filter(is_email_verified=True, is_staff=False, role='driver').count(),
+            'total_clients': User.objects.filter(role='client').count(),
+            'total_locations': lots['total_locations'],
+            'active_sessions': ParkingTransaction.objects.filter(status='ongoing').count(),
+            'live_occupancy': lots['live_occupancy'] or 0,
+        }
+        recent_transactions = ParkingTransactionSerializer(ParkingTransaction.objects.order_by('-created_at')[:10], many=True).data
+        return {
+            'kpis': kpis,
+            'recent_transactions': recent_transactions,
+        }
+
 # 2. Clients Management
 class CompanyClientsAPIView(APIView):
     permission_classes = [IsAuthenticated, IsCompanyAdmin]
     renderer_classes = [JSONRenderer]
 
     def get(self, request):
-        clients = User.objects.filter(role='client')
-        data = []
-        for client in clients:
-            lots = ParkingLot.objects.filter(client=client)
-            revenue = ParkingTransaction.objects.filter(
-                parking_space__parking_lot__client=client
-            ).aggregate(total=Sum('fee'))['total'] or 0
-            data.append({
+        """Clients with their location count and revenue, ?sort=revenue|sessions|name (default -revenue).
+
+        A plain list; passing ?page= or ?page_size= returns a
+        {count, next, previous, results} page instead.
+        """
+        clients = sort_queryset(
+            with_client_performance(User.objects.filter(role='client')).annotate(total_locations=Count('parking_lots')),
+            request, {'revenue', 'sessions', 'name', 'total_locations'}, '-revenue'
+        )
+        paginator = AnalyticsPagination()
+        page = paginator.paginate_queryset(clients, request, view=self)
+        data = [
+            {
                 'client': UserSerializer(client, context={'request': request}).data,
-                'total_locations': lots.count(),
-                'revenue': revenue,
-            })
-        return Response(data, status=status.HTTP_200_OK)
+                'total_locations': client.total_locations,
+                'revenue': client.revenue,
+            } for client in (clients if page is None else page)
+        ]
+        if page is None:
+            return Response(data, status=status.HTTP_200_OK)
+        return paginator.get_paginated_response(data)
 
     def post(self, request):
         data = request.data.copy()
@@ -282,18 +308,16 @@ class CompanyParkingHistoryAPIView(APIView):
 
 # 8. Financial Transactions
 class CompanyFinancialTransactionsAPIView(APIView):
+    """Revenue per day, week or month (?granularity=) between ?start= and ?end= (default: last 30 days)."""
     permission_classes = [IsAuthenticated, IsCompanyAdmin]
     renderer_classes = [JSONRenderer]
     def get(self, request):
-        today = datetime.today().date()
-        days = [today - timedelta(days=i) for i in range(30)]
-        revenue_by_day = []
-        for day in days:
-            total = ParkingTransaction.objects.filter(
-                created_at__date=day
-            ).aggregate(total=Sum('fee'))['total'] or 0
-            revenue_by_day.append({'date': day, 'revenue': total})
-        response = Response({'revenue_by_day': revenue_by_day})
+        try:
+            start, end, granularity = parse_report_range(request.query_params)
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        series = revenue_series(DailyRevenueRollup.objects.all(), start, end, granularity)
+        response = Response({f'revenue_by_{granularity}': series})
         response.accepted_renderer = JSONRenderer()
         response.accepted_media_type = 'application/json'
         response.renderer_context = {}
@@ -304,22 +328,54 @@ class CompanyAnalyticsAPIView(APIView):
     permission_classes = [IsAuthenticated, IsCompanyAdmin]
     renderer_classes = [JSONRenderer]
     def get(self, request):
-        clients = User.objects.filter(role='client')
-        analytics = []
-        for client in clients:
-            revenue = ParkingTransaction.objects.filter(parking_space__parking_lot__client=client).aggregate(total=Sum('fee'))['total'] or 0
-            sessions = ParkingTransaction.objects.filter(parking_space__parking_lot__client=client).count()
-            analytics.append({
+        """Revenue and completed sessions per client, ?sort=revenue|sessions|name (default -revenue); ?page= to page."""
+        clients = sort_queryset(
+            with_client_performance(User.objects.filter(role='client')),
+            request, {'revenue', 'sessions', 'name'}, '-revenue'
+        )
+        paginator = AnalyticsPagination()
+        page = paginator.paginate_queryset(clients, request, view=self)
+        analytics = [
+            {
                 'client': UserSerializer(client).data,
-                'revenue': revenue,
-                'sessions': sessions,
-            })
-        response = Response({'client_performance': analytics})
+                'revenue': client.revenue,
+                'sessions': client.sessions,
+            } for client in (clients if page is None else page)
+        ]
+        body = {'client_performance': analytics}
+        if page is not None:
+            body = {
+                'count': paginator.page.paginator.count,
+                'next': paginator.get_next_link(),
+                'previous': paginator.get_previous_link(),
+                **body,
+            }
+        response = Response(body)
         response.accepted_renderer = JSONRenderer()
         response.accepted_media_type = 'application/json'
         response.renderer_context = {}
         return response
 
+class CompanyDwellAnalyticsAPIView(APIView):
+    """Dwell-time histograms and p50/p90/p99 per client, lot, weekday and hour of entry (?client_id=, ?location_id=)."""
+    permission_classes = [IsAuthenticated, IsCompanyAdmin]
+    renderer_classes = [JSONRenderer]
+    def get(self, request):
+        try:
+            start, end, _ = parse_report_range(request.query_params)
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        sessions = ParkingTransaction.objects.all()
+        scope = 'company'
+        for param, lookup in (('client_id', 'parking_space__parking_lot__client_id'), ('location_id', 'parking_space__parking_lot_id')):
+            value = request.query_params.get(param)
+            if value:
+                if not value.isdigit():
+                    return Response({'status': 'error', 'message': f'{param} must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+                sessions = sessions.filter(**{lookup: value})
+                scope = f'{scope}:{param}:{value}'
+        return Response(dwell_report(sessions, start, end, scope, by_client=True))
+
 # 10. Notifications & Alerts
 class CompanyNotificationsAPIView(APIView):
     permission_classes = [IsAuthenticated, IsCompanyAdmin]
@@ -349,6 +405,13 @@ class CompanySettingsAPIView(APIView):
         response.renderer_context = {}
         return response
 
+# Payments service client metrics (requests, errors, latency, circuit state)
+class CompanyPaymentsMetricsAPIView(APIView):
+    permission_classes = [IsAuthenticated, IsCompanyAdmin]
+    renderer_classes = [JSONRenderer]
+    def get(self, request):
+        return Response(payments_client_metrics(), status=status.HTTP_200_OK)
+
 # 12. Support / Helpdesk
 class CompanySupportAPIView(APIView):
     permission_classes = [IsAuthenticated, IsCompanyAdmin]
@@ -0,0 +1,92 @@
+import functools
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IN_PROGRESS = 'in-progress'
+
+
+def idempotent(handler):
+    """Make a view method safe to retry with an ``Idempotency-Key`` header.
+
+    The first request with a key runs normally and its response is kept in
+    the shared cache for IDEMPOTENCY_KEY_TTL seconds; repeats with the same
+    key and body get that response back without running the view again.
+    Only successes and validation errors (400) are kept; any other error is
+    forgotten so a retry with the same key runs the view again.
+    Keys are scoped to the authenticated user. Reusing a key for a
+    different request is rejected with 422, and a repeat that arrives while
+    the first is still running gets 409. Requests without the header are
+    not affected.
+    """
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return handler(self, request, *args, **kwargs)
+
+        cache_key = 'idempotency:{}:{}'.format(
+            request.user.pk, hashlib.sha256(key.encode()).hexdigest()
+        )
+        fingerprint = hashlib.sha256(
+            request.method.encode() + request.path.encode() + b'\n' + request.body
+        ).hexdigest()
+
+        if not cache.add(cache_key, {'state': IN_PROGRESS, 'fingerprint': fingerprint},
+                         timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT):
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return replay(stored, fingerprint, key)
+            # Expired between add() and get(); take it over
+            cache.set(cache_key, {'state': IN_PROGRESS, 'fingerprint': fingerprint},
+                      timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+
+        try:
+            response = handler(self, request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if response.status_code > status.HTTP_400_BAD_REQUEST:
+            # Not a final answer (a conflict, a missing record, a server error);
+            # let the client retry with the same key
+            cache.delete(cache_key)
+            return response
+
+        cache.set(cache_key, {
+            'state': 'done',
+            'fingerprint': fingerprint,
+            'status': response.status_code,
+            'data': json.loads(JSONRenderer().render(response.data) or b'null'),
+        }, timeout=settings.IDEMPOTENCY_KEY_TTL)
+        return response
+
+    return wrapper
+
+
+def replay(stored, fingerprint, key):
+    if stored['fingerprint'] != fingerprint:
+        logger.warning(f"Idempotency-Key {key} reused for a different request")
+        return Response(
+            {'status': 'error', 'message': 'Idempotency-Key was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if stored['state'] == IN_PROGRESS:
+        return Response(
+            {'status': 'error', 'message': 'A request with this Idempotency-Key is still being processed'},
+            status=status.HTTP_409_CONFLICT
+        )
+
+    logger.info(f"Replaying stored response for Idempotency-Key {key}")
+    response = Response(stored['data'], status=stored['status'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
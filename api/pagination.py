@@ -0,0 +1,26 @@
+from rest_framework.pagination import PageNumberPagination
+
+
+class AnalyticsPagination(PageNumberPagination):
+    """?page= and ?page_size= for analytics lists; pages are cut in the database.
+
+    Paging is opt-in: these lists were unpaginated before, so without either
+    parameter ``paginate_queryset`` returns None and the caller responds
+    with the whole list in its original shape.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.page_query_param not in request.query_params and self.page_size_query_param not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+def sort_queryset(queryset, request, allowed, default):
+    """Order by ?sort= (one of ``allowed``, optionally prefixed with '-'), falling back to ``default``."""
+    sort = request.query_params.get('sort', default)
+    if sort.lstrip('-') not in allowed:
+        sort = default
+    return queryset.order_by(sort, 'id')
@@ -88,11 +88,13 @@ class ParkingLotSerializer(serializers.ModelSerializer):
             'name',
             'location',
             'total_spaces',
+            'space_count',
+            'occupied_count',
             'client',       # Read-only nested data
             'client_id',    # For POST/PUT
             'created_at',
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'space_count', 'occupied_count', 'created_at']
 
 class ParkingSpaceSerializer(serializers.ModelSerializer):
     parking_lot = ParkingLotSerializer(read_only=True)
@@ -14,7 +14,9 @@ from .views import (
     CarDeleteAPIView,
     TransactionsAPIView,
     CheckNumberPlate,
+    CheckNumberPlateBatch,
     ExitVehicle,
+    ExitVehicleBatch,
     InitiatePaymentAPIView,
     PaymentStatusCallbackAPIView,
     SupportTicketListCreateAPIView  # New view for SupportTicket
@@ -33,7 +35,9 @@ urlpatterns = [
     path('cars/<int:car_id>/delete/', CarDeleteAPIView.as_view(), name='car-delete'),
     path('transactions/', TransactionsAPIView.as_view(), name='transactions'),
     path('check-number-plate/', CheckNumberPlate.as_view(), name='check-number-plate'),
+    path('check-number-plate/batch/', CheckNumberPlateBatch.as_view(), name='check-number-plate-batch'),
     path('exit-vehicle/', ExitVehicle.as_view(), name='exit-vehicle'),
+    path('exit-vehicle/batch/', ExitVehicleBatch.as_view(), name='exit-vehicle-batch'),
     path('initiate-payment/', InitiatePaymentAPIView.as_view(), name='initiate-payment'),
     path('payment-status/', PaymentStatusCallbackAPIView.as_view(), name='payment-status-callback'),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -6,8 +6,9 @@ from rest_framework import status, generics
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.hashers import make_password, check_password
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.conf import settings
-from django.db import transaction
+from django.db import DatabaseError, IntegrityError, transaction
 import sib_api_v3_sdk
 from sib_api_v3_sdk.rest import ApiException
 import requests
@@ -15,14 +16,25 @@ import logging
 import random
 import string
 import re
+import uuid
+from datetime import datetime, timezone as dt_timezone
 from decimal import Decimal
 from users.models import User
+from users.ledger import post_entry
 from cars.models import Car
+from cars.plates import canonicalize, plate_index
 from alerts.models import Alert
 from parking_lots.models import ParkingLot, ParkingSpace
+from parking_lots.allocation import allocate_space
+from parking_lots.occupancy import occupy
 from parking_transactions.models import ParkingTransaction
+from parking_transactions.rollups import record_session_revenue
+from parking_transactions.sessions import close_session, find_open_session
 from .serializers import UserSerializer, CarSerializer, ParkingTransactionSerializer, AlertSerializer, SupportTicketSerializer
 from .models import SupportTicket
+from payments.client import CircuitOpenError, payments_client
+from payments.inbox import STATUS_RANK, record_callback
+from .idempotency import idempotent
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -34,6 +46,62 @@ brevo_api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiCli
 
 User = get_user_model()
 
+
+def parse_event_timestamp(value):
+    """Event time from a batch item: epoch seconds or ISO 8601, defaulting to now."""
+    if value in (None, ''):
+        return timezone.now()
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise ValueError(f"Invalid timestamp: {value}")
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def find_user_car(user, number_plate):
+    """The user's car a plate read refers to.
+
+    Confusion-key repair can match several of the user's cars (e.g. O/0
+    variants); the exact canonical plate then wins. Raises Car.DoesNotExist,
+    or Car.MultipleObjectsReturned when the read stays ambiguous.
+    """
+    cars = list(Car.objects.select_related('user').filter(id__in=plate_index.candidates(number_plate), user=user))
+    if len(cars) > 1:
+        cars = [car for car in cars if car.canonical_plate == canonicalize(number_plate)]
+        if len(cars) != 1:
+            raise Car.MultipleObjectsReturned(f"Plate {number_plate} matches several cars")
+    if not cars:
+        raise Car.DoesNotExist(f"No car matches plate {number_plate}")
+    return cars[0]
+
+
+def ambiguous_plate_response(request, number_plate):
+    logger.warning(f"Ambiguous number plate {number_plate} for user {request.user.email}")
+    return Response(
+        {'status': 'error', 'message': 'Ambiguous number plate: it matches more than one of your cars'},
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
+def unexpected_error_response(error):
+    """Response for an error the request did not cause, so clients retry it instead of discarding it.
+
+    A constraint violation is a conflict with concurrent writes (409); any
+    other database failure, such as a deadlock or a lost connection, is
+    transient (503); anything else is a server bug (500). Only a 400 tells a
+    client its request is invalid.
+    """
+    if isinstance(error, IntegrityError):
+        error_status = status.HTTP_409_CONFLICT
+    elif isinstance(error, DatabaseError):
+        error_status = status.HTTP_503_SERVICE_UNAVAILABLE
+    else:
+        error_status = status.HTTP_500_INTERNAL_SERVER_ERROR
+    return Response(
+        {'status': 'error', 'message': 'An unexpected error occurred', 'details': str(error)},
+        status=error_status
+    )
+
 class RegisterAPIView(APIView):
     permission_classes = [AllowAny]
 
@@ -454,6 +522,7 @@ class CarDeleteAPIView(APIView):
 class InitiatePaymentAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         user = request.user
         amount = request.data.get("amount")
@@ -505,9 +574,9 @@ class InitiatePaymentAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Generate order ID
+        # Generate order ID; it doubles as the provider's Idempotency-Key, so every top-up needs its own
         order_id = (
-            f"topup-{user.id}-{int(timezone.now().timestamp())}"
+            f"topup-{user.id}-{uuid.uuid4().hex}"
             if not parking_transaction_id
             else f"park-{parking_transaction_id}"
         )
@@ -523,12 +592,7 @@ class InitiatePaymentAPIView(APIView):
         logger.info(f"Payment payload for user {user.email}: {payload}")
 
         try:
-            response = requests.post(
-                f"{settings.PAYMENTS_API_URL}/api/v1/payments/process/",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=10
-            )
+            response = payments_client.post("/api/v1/payments/process/", payload, idempotency_key=order_id)
             logger.info(f"Payment API response for user {user.email} [{response.status_code}]: {response.text}")
 
             if response.status_code >= 400:
@@ -579,11 +643,10 @@ class InitiatePaymentAPIView(APIView):
                         payment_status='PENDING',
                         created_at=timezone.now(),
                     )
-                    user.balance = (user.balance or Decimal('0')) + amount
-                    user.save()
+                    post_entry(user.id, amount, 'topup', reference=order_id)
                 else:
                     try:
-                        parking_txn = ParkingTransaction.objects.select_related('car__user').get(
+                        parking_txn = ParkingTransaction.objects.select_related('car__user', 'parking_space__parking_lot').get(
                             id=parking_transaction_id, car__user=user, status='ongoing'
                         )
                         parking_txn.fee = amount
@@ -592,6 +655,7 @@ class InitiatePaymentAPIView(APIView):
                         parking_txn.exit_time = timezone.now()
                         parking_txn.duration = parking_txn.exit_time - parking_txn.entry_time
                         parking_txn.save()
+                        record_session_revenue(parking_txn)
                     except ParkingTransaction.DoesNotExist:
                         logger.error(f"Invalid or unauthorized transaction {parking_transaction_id} for user {user.email}")
                         return Response(
@@ -606,6 +670,12 @@ class InitiatePaymentAPIView(APIView):
                 "transaction": None
             }, status=status.HTTP_201_CREATED)
 
+        except CircuitOpenError:
+            logger.warning(f"Payment service unavailable, rejecting payment for user {user.email}")
+            return Response(
+                {"status": "error", "message": "Payment service is temporarily unavailable, please try again shortly"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
         except requests.exceptions.RequestException as e:
             logger.error(f"Payment request failed for user {user.email}: {str(e)}")
             return Response(
@@ -621,26 +691,28 @@ class InitiatePaymentAPIView(APIView):
 
 
 class PaymentStatusCallbackAPIView(APIView):
+    """
+    Stores the callback in the payments inbox and acknowledges at once; the
+    process_payment_callbacks worker applies it to the transaction.
+    """
     permission_classes = [AllowAny]  # Payment service may not send auth headers
 
     def post(self, request):
         data = request.data
+        if data.get('status') not in STATUS_RANK:
+            logger.error(f"Invalid payment callback status: {data.get('status')}")
+            return Response(
+                {"status": "error", "message": "Invalid payment status"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         try:
-            transaction = ParkingTransaction.objects.get(id=data["parking_transaction_id"])
-            transaction.payment_status = data["status"]
-            transaction.mpesa_transaction_id = data.get("mpesa_transaction_id")
-            if data["status"] == "PAID":
-                transaction.status = "completed"
-            elif data["status"] == "FAILED":
-                transaction.status = "failed"
-            transaction.save()
-            logger.info(f"Payment status updated for transaction {transaction.id}: {data['status']}")
-            return Response({"status": "success", "message": "Status updated"}, status=status.HTTP_200_OK)
-        except ParkingTransaction.DoesNotExist:
-            logger.error(f"Transaction not found for payment callback: {data.get('parking_transaction_id')}")
+            record_callback(data)
+            return Response({"status": "success", "message": "Callback received"}, status=status.HTTP_200_OK)
+        except (KeyError, ValueError, TypeError):
+            logger.error(f"Invalid payment callback: {data}")
             return Response(
-                {"status": "error", "message": "Parking transaction not found"},
-                status=status.HTTP_404_NOT_FOUND
+                {"status": "error", "message": "Parking transaction ID is required"},
+                status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
             logger.error(f"Error processing payment callback: {str(e)}")
@@ -652,16 +724,18 @@ class PaymentStatusCallbackAPIView(APIView):
 class CheckNumberPlate(APIView):
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         number_plate = request.data.get('number_plate')
         parking_space_id = request.data.get('parking_space_id')
+        parking_lot_id = request.data.get('parking_lot_id')
 
         logger.info(f"Checking number plate {number_plate} for user {request.user.email}")
 
-        if not number_plate or not parking_space_id:
+        if not number_plate or not (parking_space_id or parking_lot_id):
             logger.error(f"Missing number plate or parking space ID for user {request.user.email}")
             return Response(
-                {'status': 'error', 'message': 'Number plate and parking space ID are required'},
+                {'status': 'error', 'message': 'Number plate and parking space ID (or parking lot ID) are required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
@@ -673,6 +747,18 @@ class CheckNumberPlate(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        if not parking_space_id:
+            return self.enter_lot(request, number_plate, parking_lot_id)
+
+        try:
+            parking_space_id = int(parking_space_id)
+        except (ValueError, TypeError):
+            logger.error(f"Invalid parking space ID for user {request.user.email}: {parking_space_id}")
+            return Response(
+                {'status': 'error', 'message': 'Invalid parking space ID'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
             with transaction.atomic():
                 parking_space = ParkingSpace.objects.select_for_update().get(id=parking_space_id)
@@ -684,7 +770,7 @@ class CheckNumberPlate(APIView):
                     )
 
                 try:
-                    car = Car.objects.select_related('user').get(number_plate__iexact=number_plate, user=request.user)
+                    car = find_user_car(request.user, number_plate)
                     if car.user.balance < settings.MINIMUM_PARKING_BALANCE:
                         logger.warning(f"Insufficient balance for user {request.user.email}: {car.user.balance}")
                         return Response(
@@ -695,7 +781,7 @@ class CheckNumberPlate(APIView):
                     parking_space.is_occupied = True
                     parking_space.save()
 
-                    transaction = ParkingTransaction.objects.create(
+                    parking_txn = ParkingTransaction.objects.create(
                         car=car,
                         parking_space=parking_space,
                         entry_time=timezone.now(),
@@ -703,11 +789,12 @@ class CheckNumberPlate(APIView):
                         payment_status='PENDING',
                         created_at=timezone.now()
                     )
-                    logger.info(f"Transaction created for user {request.user.email}: {transaction.id}")
+                    occupy(parking_space.parking_lot_id)
+                    logger.info(f"Transaction created for user {request.user.email}: {parking_txn.id}")
                     return Response({
                         'status': 'success',
                         'message': 'Vehicle registered, entry logged',
-                        'transaction': ParkingTransactionSerializer(transaction).data
+                        'transaction': ParkingTransactionSerializer(parking_txn).data
                     }, status=status.HTTP_201_CREATED)
 
                 except Car.DoesNotExist:
@@ -730,98 +817,434 @@ class CheckNumberPlate(APIView):
                 {'status': 'error', 'message': 'Parking space not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        except Car.MultipleObjectsReturned:
+            return ambiguous_plate_response(request, number_plate)
         except Exception as e:
             logger.error(f"Error checking number plate for user {request.user.email}: {str(e)}")
+            return unexpected_error_response(e)
+
+    def enter_lot(self, request, number_plate, parking_lot_id):
+        """Admit the car to whichever space in the lot is free (no parking_space_id given)."""
+        try:
+            parking_lot = ParkingLot.objects.get(id=parking_lot_id)
+        except (ParkingLot.DoesNotExist, ValueError, TypeError):
+            logger.error(f"Parking lot not found: {parking_lot_id}")
+            return Response(
+                {'status': 'error', 'message': 'Parking lot not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            car = find_user_car(request.user, number_plate)
+        except Car.MultipleObjectsReturned:
+            return ambiguous_plate_response(request, number_plate)
+        except Car.DoesNotExist:
+            alert = Alert.objects.create(
+                number_plate=number_plate,
+                description=f"Unregistered car with number plate {number_plate} at {parking_lot.name}",
+                status='unresolved'
+            )
+            logger.warning(f"Unregistered vehicle {number_plate} detected at lot {parking_lot.id}, alert created")
+            return Response({
+                'status': 'alert',
+                'message': 'Unregistered vehicle, alert logged',
+                'alert': AlertSerializer(alert).data
+            }, status=status.HTTP_201_CREATED)
+
+        if car.user.balance < settings.MINIMUM_PARKING_BALANCE:
+            logger.warning(f"Insufficient balance for user {request.user.email}: {car.user.balance}")
             return Response(
-                {'status': 'error', 'message': 'An unexpected error occurred', 'details': str(e)},
+                {'status': 'error', 'message': f'Insufficient balance. Minimum required: {settings.MINIMUM_PARKING_BALANCE}'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        try:
+            with transaction.atomic():
+                parking_space = allocate_space(parking_lot.id)
+                if parking_space is None:
+                    logger.warning(f"No free parking space in lot {parking_lot.id} for user {request.user.email}")
+                    return Response(
+                        {'status': 'error', 'message': 'No free parking space in this lot'},
+                        status=status.HTTP_409_CONFLICT
+                    )
+
+                parking_txn = ParkingTransaction.objects.create(
+                    car=car,
+                    parking_space=parking_space,
+                    entry_time=timezone.now(),
+                    status='ongoing',
+                    payment_status='PENDING',
+                    created_at=timezone.now()
+                )
+        except Exception as e:
+            logger.error(f"Error allocating a space in lot {parking_lot.id} for user {request.user.email}: {str(e)}")
+            return unexpected_error_response(e)
+
+        logger.info(f"Transaction created for user {request.user.email}: {parking_txn.id} (space {parking_space.id})")
+        return Response({
+            'status': 'success',
+            'message': 'Vehicle registered, entry logged',
+            'transaction': ParkingTransactionSerializer(parking_txn).data
+        }, status=status.HTTP_201_CREATED)
+
+class CheckNumberPlateBatch(APIView):
+    """
+    Bulk variant of CheckNumberPlate for gate controllers and ingestion workers.
+
+    Accepts {"events": [{"number_plate", "parking_space_id", "timestamp", "event_id"}, ...]},
+    resolves every car in one query, locks the affected spaces once and writes
+    all transactions and alerts with bulk inserts in a single atomic block.
+    Events whose optional event_id was already applied, or appears earlier
+    in the same batch, are reported as duplicates instead of being applied
+    again, so spooled batches can be replayed safely. Plates that match more
+    than one car are rejected per event. Returns one result per event, in
+    request order.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    def post(self, request):
+        events = request.data.get('events')
+
+        if not isinstance(events, list) or not events:
+            return Response(
+                {'status': 'error', 'message': 'A non-empty list of events is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(events) > settings.CHECK_NUMBER_PLATE_BATCH_LIMIT:
+            return Response(
+                {'status': 'error', 'message': f'At most {settings.CHECK_NUMBER_PLATE_BATCH_LIMIT} events per batch'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        logger.info(f"Checking {len(events)} number plates in batch for user {request.user.email}")
+
+        results = [None] * len(events)
+        valid = []
+        first_index, repeats = {}, []
+        for index, event in enumerate(events):
+            number_plate = str(event.get('number_plate') or '').upper().replace(' ', '')
+            if not number_plate or not event.get('parking_space_id'):
+                results[index] = {'index': index, 'status': 'error', 'message': 'Number plate and parking space ID are required'}
+                continue
+            if not re.match(r'^[A-Z0-9]{1,8}$', number_plate):
+                results[index] = {'index': index, 'status': 'error', 'message': 'Invalid number plate format'}
+                continue
+            try:
+                parking_space_id = int(event['parking_space_id'])
+            except (ValueError, TypeError):
+                results[index] = {'index': index, 'status': 'error', 'message': 'Invalid parking space ID'}
+                continue
+            try:
+                entry_time = parse_event_timestamp(event.get('timestamp'))
+            except (ValueError, TypeError, OverflowError) as e:
+                results[index] = {'index': index, 'status': 'error', 'message': str(e)}
+                continue
+            event_id = event.get('event_id') or None
+            # A resent event within the same batch is applied once and reported like the first copy
+            if event_id in first_index:
+                repeats.append((index, first_index[event_id]))
+                continue
+            if event_id:
+                first_index[event_id] = index
+            valid.append((entry_time, index, number_plate, parking_space_id, event_id))
+
+        # Replayed events: report what they produced the first time instead of applying them again
+        event_ids = {item[4] for item in valid if item[4]}
+        if event_ids:
+            seen = {
+                event_id: ('success', 'transaction_id', pk) for event_id, pk in ParkingTransaction.objects.filter(
+                    entry_event_id__in=event_ids
+                ).values_list('entry_event_id', 'id')
+            }
+            seen.update({
+                event_id: ('alert', 'alert_id', pk) for event_id, pk in Alert.objects.filter(
+                    event_id__in=event_ids
+                ).values_list('event_id', 'id')
+            })
+            for item in [item for item in valid if item[4] in seen]:
+                result_status, key, pk = seen[item[4]]
+                results[item[1]] = {'index': item[1], 'status': result_status, key: pk, 'duplicate': True}
+                valid.remove(item)
+
+        # Resolve noisy reads through the OCR-tolerant plate index, then load all candidate cars at once.
+        # Drivers may only check in their own cars; gate accounts resolve any plate.
+        candidate_ids = {item[2]: plate_index.candidates(item[2]) for item in valid}
+        cars = Car.objects.select_related('user').filter(
+            id__in={car_id for car_ids in candidate_ids.values() for car_id in car_ids}
+        )
+        if request.user.role == 'driver':
+            cars = cars.filter(user=request.user)
+        cars_by_id = {car.id: car for car in cars}
+        cars_by_plate, ambiguous_plates = {}, set()
+        for plate, car_ids in candidate_ids.items():
+            matches = [cars_by_id[car_id] for car_id in car_ids if car_id in cars_by_id]
+            if len(matches) > 1:
+                # As in find_user_car, the exact canonical plate wins over confusion-key variants
+                matches = [car for car in matches if car.canonical_plate == canonicalize(plate)]
+                if len(matches) != 1:
+                    ambiguous_plates.add(plate)
+                    continue
+            if matches:
+                cars_by_plate[plate] = matches[0]
+
+        try:
+            with transaction.atomic():
+                spaces = {
+                    space.id: space for space in ParkingSpace.objects.select_for_update().filter(
+                        id__in={item[3] for item in valid}
+                    ).order_by('id')
+                }
+                parked_car_ids = set(ParkingTransaction.objects.filter(
+                    car__in=cars_by_plate.values(), status='ongoing'
+                ).values_list('car_id', flat=True))
+                new_transactions, new_alerts, occupied_ids = [], [], []
+
+                # Apply events in the order the vehicles actually arrived
+                for entry_time, index, number_plate, parking_space_id, event_id in sorted(valid, key=lambda item: item[:2]):
+                    parking_space = spaces.get(parking_space_id)
+                    if parking_space is None:
+                        results[index] = {'index': index, 'status': 'error', 'message': 'Parking space not found'}
+                        continue
+                    if parking_space.is_occupied:
+                        results[index] = {'index': index, 'status': 'error', 'message': 'Parking space already occupied'}
+                        continue
+
+                    if number_plate in ambiguous_plates:
+                        results[index] = {
+                            'index': index, 'status': 'error',
+                            'message': 'Ambiguous number plate: it matches more than one car'
+                        }
+                        continue
+                    car = cars_by_plate.get(number_plate)
+                    if car is None:
+                        new_alerts.append((index, Alert(
+                            parking_space=parking_space,
+                            number_plate=number_plate,
+                            description=f"Unregistered car with number plate {number_plate}",
+                            status='unresolved',
+                            event_id=event_id
+                        )))
+                        continue
+                    if car.id in parked_car_ids:
+                        results[index] = {'index': index, 'status': 'error', 'message': 'Vehicle already has an ongoing session'}
+                        continue
+                    if car.user.balance < settings.MINIMUM_PARKING_BALANCE:
+                        results[index] = {
+                            'index': index, 'status': 'error',
+                            'message': f'Insufficient balance. Minimum required: {settings.MINIMUM_PARKING_BALANCE}'
+                        }
+                        continue
+
+                    parking_space.is_occupied = True
+                    occupied_ids.append(parking_space.id)
+                    parked_car_ids.add(car.id)
+                    new_transactions.append((index, ParkingTransaction(
+                        car=car,
+                        parking_space=parking_space,
+                        entry_time=entry_time,
+                        status='ongoing',
+                        payment_status='PENDING',
+                        entry_event_id=event_id
+                    )))
+
+                ParkingSpace.objects.filter(id__in=occupied_ids).update(is_occupied=True)
+                occupied_per_lot = {}
+                for space_id in occupied_ids:
+                    parking_lot_id = spaces[space_id].parking_lot_id
+                    occupied_per_lot[parking_lot_id] = occupied_per_lot.get(parking_lot_id, 0) + 1
+                for parking_lot_id, count in occupied_per_lot.items():
+                    occupy(parking_lot_id, count)
+                ParkingTransaction.objects.bulk_create([item for _, item in new_transactions])
+                Alert.objects.bulk_create([item for _, item in new_alerts])
+
+        except Exception as e:
+            logger.error(f"Error checking number plate batch for user {request.user.email}: {str(e)}")
+            return unexpected_error_response(e)
+
+        for index, parking_txn in new_transactions:
+            results[index] = {'index': index, 'status': 'success', 'transaction_id': parking_txn.id}
+        for index, alert in new_alerts:
+            results[index] = {'index': index, 'status': 'alert', 'alert_id': alert.id}
+        for index, first in repeats:
+            results[index] = {**results[first], 'index': index, 'duplicate': True}
+
+        logger.info(
+            f"Batch for user {request.user.email}: {len(new_transactions)} entries, "
+            f"{len(new_alerts)} alerts, {len(events) - len(new_transactions) - len(new_alerts)} rejected"
+        )
+        return Response({
+            'status': 'success',
+            'entries': len(new_transactions),
+            'alerts': len(new_alerts),
+            'results': results
+        }, status=status.HTTP_200_OK)
+
 class ExitVehicle(APIView):
+    """
+    Close a parking session, either by transaction_id or, for exit gates that
+    only see the car, by number_plate and parking_lot_id.
+    """
     permission_classes = [IsAuthenticated]
 
+    @idempotent
     def post(self, request):
         transaction_id = request.data.get('transaction_id')
+        number_plate = request.data.get('number_plate')
+        parking_lot_id = request.data.get('parking_lot_id')
 
-        logger.info(f"Processing exit for transaction {transaction_id} by user {request.user.email}")
+        logger.info(f"Processing exit for transaction {transaction_id or number_plate} by user {request.user.email}")
 
-        if not transaction_id:
+        if not transaction_id and not (number_plate and parking_lot_id):
             logger.error(f"Missing transaction ID for user {request.user.email}")
             return Response(
-                {'status': 'error', 'message': 'Transaction ID is required'},
+                {'status': 'error', 'message': 'Transaction ID, or number plate and parking lot ID, are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            transaction_id = int(transaction_id) if transaction_id else None
+            parking_lot_id = int(parking_lot_id) if parking_lot_id else None
+        except (ValueError, TypeError):
+            logger.error(f"Invalid transaction or parking lot ID for user {request.user.email}")
+            return Response(
+                {'status': 'error', 'message': 'Invalid transaction ID or parking lot ID'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         try:
             with transaction.atomic():
-                transaction = ParkingTransaction.objects.select_related('car__user', 'parking_space').get(
-                    id=transaction_id, car__user=request.user, status='ongoing'
-                )
-                transaction.exit_time = timezone.now()
-                transaction.duration = transaction.exit_time - transaction.entry_time
-                transaction.fee = transaction.calculate_fee()  # Assumes calculate_fee method in model
-                transaction.status = 'completed'
-                transaction.payment_status = 'PENDING'
-                transaction.parking_space.is_occupied = False
-                transaction.parking_space.save()
-                transaction.save()
-
-                # Normalize phone number for payment payload
-                stored_phone = transaction.car.user.phone_number
-                if stored_phone.startswith('0'):
-                    normalized_phone = '254' + stored_phone[1:]
+                if transaction_id:
+                    parking_txn = ParkingTransaction.objects.select_related('car__user', 'parking_space__parking_lot').get(
+                        id=transaction_id, car__user=request.user, status='ongoing'
+                    )
                 else:
-                    normalized_phone = stored_phone
-
-                # Initiate payment
-                payment_payload = {
-                    "order_id": f"park-{transaction.id}",
-                    "user_id": str(transaction.car.user.id),
-                    "amount": f"{transaction.fee:.2f}",
-                    "client_till_number": settings.CLIENT_TILL_NUMBER,
-                    "phone_number": normalized_phone
-                }
-
-                logger.info(f"Payment payload for transaction {transaction.id}: {payment_payload}")
-
-                response = requests.post(
-                    f"{settings.PAYMENTS_API_URL}/api/v1/payments/process/",
-                    json=payment_payload,
-                    headers={"Content-Type": "application/json"},
-                    timeout=10
-                )
-
-                if response.status_code != 201:
-                    try:
-                        error_json = response.json()
-                    except ValueError:
-                        error_json = response.text
-                    logger.error(f"Payment initiation failed for transaction {transaction.id}: {error_json}")
-                    return Response({
-                        "status": "error",
-                        "message": "Failed to initiate payment",
-                        "details": error_json
-                    }, status=response.status_code)
+                    # Drivers may only check out their own cars; gate accounts check out any plate
+                    parking_txn = find_open_session(
+                        number_plate.upper().replace(' ', ''), parking_lot_id,
+                        user=request.user if request.user.role == 'driver' else None
+                    )
+                outbox = close_session(parking_txn)
 
-                logger.info(f"Exit processed for transaction {transaction.id}")
-                return Response({
-                    "status": "success",
-                    "message": "Exit processed. Payment initiation sent.",
-                    "transaction": ParkingTransactionSerializer(transaction).data
-                }, status=status.HTTP_200_OK)
+            logger.info(f"Exit processed for transaction {parking_txn.id}, payment {outbox.order_id} queued")
+            return Response({
+                "status": "success",
+                "message": "Exit processed. Payment initiation queued.",
+                "payment_order_id": outbox.order_id,
+                "transaction": ParkingTransactionSerializer(parking_txn).data
+            }, status=status.HTTP_200_OK)
 
         except ParkingTransaction.DoesNotExist:
-            logger.error(f"Transaction not found or unauthorized: {transaction_id} for user {request.user.email}")
+            logger.error(f"Transaction not found or unauthorized: {transaction_id or number_plate} for user {request.user.email}")
             return Response(
                 {'status': 'error', 'message': 'Transaction not found or not authorized'},
                 status=status.HTTP_404_NOT_FOUND
             )
         except Exception as e:
-            logger.error(f"Error processing exit for transaction {transaction_id}: {str(e)}")
+            logger.error(f"Error processing exit for transaction {transaction_id or number_plate}: {str(e)}")
+            return unexpected_error_response(e)
+
+class ExitVehicleBatch(APIView):
+    """
+    Bulk exit-by-plate for exit cameras and gate controllers.
+
+    Accepts {"events": [{"number_plate", "parking_lot_id" or "parking_space_id", "timestamp", "event_id"}, ...]}
+    and closes the matching ongoing session for each, in arrival order. Each
+    event is applied in its own transaction; events whose event_id already
+    closed a session, or appears earlier in the same batch, are reported as
+    duplicates. Returns one result per event, in request order.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @idempotent
+    def post(self, request):
+        events = request.data.get('events')
+
+        if not isinstance(events, list) or not events:
             return Response(
-                {'status': 'error', 'message': 'An unexpected error occurred', 'details': str(e)},
+                {'status': 'error', 'message': 'A non-empty list of events is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if len(events) > settings.EXIT_VEHICLE_BATCH_LIMIT:
+            return Response(
+                {'status': 'error', 'message': f'At most {settings.EXIT_VEHICLE_BATCH_LIMIT} events per batch'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        logger.info(f"Processing {len(events)} exits in batch for user {request.user.email}")
+
+        results = [None] * len(events)
+        valid = []
+        first_index, repeats = {}, []
+        for index, event in enumerate(events):
+            number_plate = str(event.get('number_plate') or '').upper().replace(' ', '')
+            if not number_plate or not (event.get('parking_lot_id') or event.get('parking_space_id')):
+                results[index] = {'index': index, 'status': 'error', 'message': 'Number plate and parking lot ID are required'}
+                continue
+            try:
+                parking_lot_id = int(event['parking_lot_id']) if event.get('parking_lot_id') else None
+                parking_space_id = None if parking_lot_id else int(event['parking_space_id'])
+            except (ValueError, TypeError):
+                results[index] = {'index': index, 'status': 'error', 'message': 'Invalid parking lot or parking space ID'}
+                continue
+            try:
+                exit_time = parse_event_timestamp(event.get('timestamp'))
+            except (ValueError, TypeError, OverflowError) as e:
+                results[index] = {'index': index, 'status': 'error', 'message': str(e)}
+                continue
+            event_id = event.get('event_id') or None
+            # A resent event within the same batch is applied once and reported like the first copy
+            if event_id in first_index:
+                repeats.append((index, first_index[event_id]))
+                continue
+            if event_id:
+                first_index[event_id] = index
+            valid.append((exit_time, index, number_plate, parking_lot_id, parking_space_id, event_id))
+
+        # Exit cameras may be configured per space rather than per lot
+        lot_by_space = dict(ParkingSpace.objects.filter(
+            id__in={item[4] for item in valid if item[4] is not None}
+        ).values_list('id', 'parking_lot_id'))
+
+        event_ids = {item[5] for item in valid if item[5]}
+        seen = dict(ParkingTransaction.objects.filter(exit_event_id__in=event_ids).values_list('exit_event_id', 'id'))
+
+        user = request.user if request.user.role == 'driver' else None
+        exits = 0
+        for exit_time, index, number_plate, parking_lot_id, parking_space_id, event_id in sorted(valid, key=lambda item: item[:2]):
+            if event_id in seen:
+                results[index] = {'index': index, 'status': 'success', 'transaction_id': seen[event_id], 'duplicate': True}
+                continue
+            if parking_lot_id is None:
+                parking_lot_id = lot_by_space.get(parking_space_id)
+                if parking_lot_id is None:
+                    results[index] = {'index': index, 'status': 'error', 'message': 'Parking space not found'}
+                    continue
+            try:
+                with transaction.atomic():
+                    parking_txn = find_open_session(number_plate, parking_lot_id, user=user)
+                    outbox = close_session(parking_txn, exit_time=exit_time, exit_event_id=event_id)
+            except ParkingTransaction.DoesNotExist as e:
+                results[index] = {'index': index, 'status': 'error', 'message': str(e)}
+                continue
+            except Exception as e:
+                # Exits already applied are committed and come back as duplicates when the batch is retried
+                logger.error(f"Error processing exit for {number_plate} in batch: {str(e)}")
+                return unexpected_error_response(e)
+            exits += 1
+            results[index] = {
+                'index': index, 'status': 'success', 'transaction_id': parking_txn.id,
+                'fee': f"{parking_txn.fee:.2f}", 'payment_order_id': outbox.order_id
+            }
+        for index, first in repeats:
+            results[index] = {**results[first], 'index': index, 'duplicate': True}
+
+        logger.info(f"Exit batch for user {request.user.email}: {exits} exits, {len(events) - exits} not applied")
+        return Response({
+            'status': 'success',
+            'exits': exits,
+            'results': results
+        }, status=status.HTTP_200_OK)
 
 class TransactionsAPIView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CarsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cars'
+
+    def ready(self):
+        from cars import signals  # noqa: F401
+        from cars.plates import check_shared_cache
+
+        check_shared_cache()
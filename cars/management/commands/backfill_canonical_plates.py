@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from cars.models import Car
+from cars.plates import canonicalize, invalidate_plate_index
+
+
+class Command(BaseCommand):
+    help = "Fill Car.canonical_plate for rows saved before the column existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = []
+        for car in Car.objects.only('id', 'number_plate', 'canonical_plate').iterator(chunk_size=options['batch_size']):
+            canonical_plate = canonicalize(car.number_plate)
+            if car.canonical_plate != canonical_plate:
+                car.canonical_plate = canonical_plate
+                updated.append(car)
+            if len(updated) >= options['batch_size']:
+                Car.objects.bulk_update(updated, ['canonical_plate'])
+                updated = []
+        Car.objects.bulk_update(updated, ['canonical_plate'])
+        invalidate_plate_index()
+        self.stdout.write(self.style.SUCCESS("Canonical plates backfilled"))
@@ -1,13 +1,19 @@
 from django.db import models
 from users.models import User
+from cars.plates import canonicalize
 
 class Car(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     number_plate = models.CharField(max_length=20, unique=True)
+    canonical_plate = models.CharField(max_length=20, db_index=True, editable=False, blank=True)
     make = models.CharField(max_length=50, blank=True)
     model = models.CharField(max_length=50, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        self.canonical_plate = canonicalize(self.number_plate)
+        super().save(*args, **kwargs)
+
     def __str__(self):
-        return self.number_plate
\ No newline at end of file
+        return self.number_plate
@@ -0,0 +1,182 @@
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+PLATE_INDEX_VERSION_KEY = 'cars:plate-index-version'
+PLATE_INDEX_SEQUENCE_KEY = 'cars:plate-index-sequence'
+PLATE_INDEX_CHANGE_KEY = 'cars:plate-index-change:{}'
+PLATE_INDEX_CHANGE_TTL = 3600  # seconds a published change stays readable
+PLATE_INDEX_MAX_CHANGES = 1000  # a process further behind than this reloads instead
+PLATE_INDEX_GAP_TIMEOUT = 5  # seconds to wait for a change that is numbered but not yet readable
+
+# Cache backends that are private to each process
+LOCAL_CACHE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+# Characters OCR routinely swaps, folded onto one representative each
+CONFUSABLE = str.maketrans({'O': '0', 'Q': '0', 'D': '0', 'I': '1', 'L': '1', 'B': '8', 'S': '5', 'Z': '2', 'G': '6'})
+TO_LETTER = str.maketrans({'0': 'O', '1': 'I', '8': 'B', '5': 'S', '2': 'Z', '6': 'G'})
+TO_DIGIT = str.maketrans({'O': '0', 'Q': '0', 'D': '0', 'I': '1', 'L': '1', 'B': '8', 'S': '5', 'Z': '2', 'G': '6'})
+
+# Kenyan private plates: KAA 123A (and older KAA 123 without the suffix letter)
+KENYAN_PLATE = re.compile(r'^K[A-Z]{2}\d{3}[A-Z]?$')
+
+
+def canonicalize(plate):
+    """Canonical storage/lookup form: uppercase, no spaces, dashes or dots."""
+    return re.sub(r'[^A-Z0-9]', '', (plate or '').upper())
+
+
+def confusion_key(plate):
+    """Collapse OCR-confusable characters so 'KDA 123B' and 'KDA1238' share a key."""
+    return canonicalize(plate).translate(CONFUSABLE)
+
+
+def repair(plate):
+    """Coerce a noisy read into the Kenyan plate layout where that is unambiguous.
+
+    Letters are forced in the prefix and suffix positions and digits in the
+    number block, e.g. 'KDA12BA' -> 'KDA128A'. Reads that do not have the
+    right length are returned canonicalized but otherwise unchanged.
+    """
+    plate = canonicalize(plate)
+    if len(plate) not in (6, 7):
+        return plate
+    repaired = plate[:3].translate(TO_LETTER) + plate[3:6].translate(TO_DIGIT) + plate[6:].translate(TO_LETTER)
+    return repaired if KENYAN_PLATE.match(repaired) else plate
+
+
+class PlateIndex:
+    """In-memory map from a noisy plate read to candidate car ids.
+
+    Exact canonical plates and confusion keys are both held in dicts, so a
+    lookup is O(1) regardless of fleet size. The table is loaded once per
+    process; after that each Car save or delete is published to the shared
+    cache as a numbered change (see ``record_plate_change``) and every
+    process applies just those rows on its next lookup. A full reload only
+    happens when the generation key is bumped (bulk changes such as the
+    canonical plate backfill), when a process has fallen too far behind,
+    or when a numbered change has gone missing from the cache.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.sequence = 0
+        self.gap_since = None
+        self.by_plate = {}
+        self.by_key = {}
+        self.by_car = {}
+
+    def _load(self, version):
+        from cars.models import Car
+
+        # Read the sequence first: changes published while loading are applied again, harmlessly
+        sequence = cache.get(PLATE_INDEX_SEQUENCE_KEY, 0)
+        by_plate = {}
+        by_key = defaultdict(list)
+        by_car = {}
+        for car_id, canonical_plate in Car.objects.values_list('id', 'canonical_plate'):
+            by_plate[canonical_plate] = car_id
+            by_key[confusion_key(canonical_plate)].append((car_id, canonical_plate))
+            by_car[car_id] = canonical_plate
+        self.by_plate = by_plate
+        self.by_key = dict(by_key)
+        self.by_car = by_car
+        self.version = version
+        self.sequence = sequence
+        self.gap_since = None
+
+    def _apply(self, car_id, canonical_plate):
+        """Upsert (or, with canonical_plate None, remove) one car."""
+        old_plate = self.by_car.pop(car_id, None)
+        if old_plate is not None:
+            if self.by_plate.get(old_plate) == car_id:
+                del self.by_plate[old_plate]
+            key = confusion_key(old_plate)
+            remaining = [match for match in self.by_key.get(key, []) if match[0] != car_id]
+            if remaining:
+                self.by_key[key] = remaining
+            else:
+                self.by_key.pop(key, None)
+        if canonical_plate is not None:
+            self.by_plate[canonical_plate] = car_id
+            self.by_key.setdefault(confusion_key(canonical_plate), []).append((car_id, canonical_plate))
+            self.by_car[car_id] = canonical_plate
+
+    def refresh(self):
+        version = cache.get_or_set(PLATE_INDEX_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        sequence = cache.get(PLATE_INDEX_SEQUENCE_KEY, 0)
+        if version == self.version and sequence == self.sequence:
+            return
+        with self.lock:
+            if version != self.version or not 0 <= sequence - self.sequence <= PLATE_INDEX_MAX_CHANGES:
+                self._load(version)
+                return
+            wanted = range(self.sequence + 1, sequence + 1)
+            changes = cache.get_many([PLATE_INDEX_CHANGE_KEY.format(number) for number in wanted])
+            for number in wanted:
+                change = changes.get(PLATE_INDEX_CHANGE_KEY.format(number))
+                if change is None:
+                    # Either still being published or evicted; wait briefly, then fall back to a reload
+                    self.gap_since = self.gap_since or time.monotonic()
+                    if time.monotonic() - self.gap_since > PLATE_INDEX_GAP_TIMEOUT:
+                        self._load(version)
+                    return
+                self._apply(*change)
+                self.sequence = number
+                self.gap_since = None
+
+    def candidates(self, plate):
+        """Return car ids the read could belong to, best match first."""
+        self.refresh()
+        plate = canonicalize(plate)
+        for attempt in (plate, repair(plate)):
+            if attempt in self.by_plate:
+                return [self.by_plate[attempt]]
+        matches = self.by_key.get(confusion_key(plate), [])
+        # Plates sharing a confusion key have equal length; rank by differing characters
+        ranked = sorted(matches, key=lambda match: sum(a != b for a, b in zip(match[1], plate)))
+        return [car_id for car_id, _ in ranked]
+
+    def resolve(self, plate):
+        """Return the single car id for a read, or None if it is unknown or ambiguous."""
+        candidates = self.candidates(plate)
+        return candidates[0] if len(candidates) == 1 else None
+
+
+def record_plate_change(car_id, canonical_plate):
+    """Publish one car's new plate (None once deleted) to every process's index after commit."""
+    def publish():
+        cache.add(PLATE_INDEX_SEQUENCE_KEY, 0, timeout=None)
+        sequence = cache.incr(PLATE_INDEX_SEQUENCE_KEY)
+        cache.set(PLATE_INDEX_CHANGE_KEY.format(sequence), (car_id, canonical_plate), timeout=PLATE_INDEX_CHANGE_TTL)
+
+    transaction.on_commit(publish)
+
+
+def invalidate_plate_index():
+    """Make every process reload the whole index, e.g. after bulk updates that send no signals."""
+    cache.set(PLATE_INDEX_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def check_shared_cache():
+    """The index is only kept consistent across processes through a shared cache; refuse to start without one."""
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in LOCAL_CACHE_BACKENDS and not settings.PLATE_INDEX_ALLOW_LOCAL_CACHE:
+        raise ImproperlyConfigured(
+            f"The plate index needs a cache shared by all processes, but the default cache is {backend}. "
+            "Set REDIS_URL, or PLATE_INDEX_ALLOW_LOCAL_CACHE=true for a single-process setup."
+        )
+
+
+plate_index = PlateIndex()
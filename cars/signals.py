@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from cars.models import Car
+from cars.plates import record_plate_change
+
+
+@receiver(post_save, sender=Car)
+def car_saved(sender, instance, **kwargs):
+    record_plate_change(instance.id, instance.canonical_plate)
+
+
+@receiver(post_delete, sender=Car)
+def car_deleted(sender, instance, **kwargs):
+    record_plate_change(instance.id, None)
@@ -0,0 +1,42 @@
+from django.conf import settings
+
+
+def camera_defaults():
+    return {
+        'sample_interval': settings.CCTV_SAMPLE_INTERVAL,
+        'min_confidence': settings.CCTV_MIN_CONFIDENCE,
+        'reconnect_delay': settings.CCTV_RECONNECT_DELAY,
+        'motion_threshold': settings.CCTV_MOTION_THRESHOLD,
+        'motion_min_changed': settings.CCTV_MOTION_MIN_CHANGED,
+        'motion_hold': settings.CCTV_MOTION_HOLD,
+    }
+
+
+def ocr_options(workers=None):
+    return {
+        'size': workers or settings.CCTV_OCR_WORKERS,
+        'slots': settings.CCTV_OCR_SLOTS,
+        'max_age': settings.CCTV_OCR_MAX_AGE,
+        'gpu': settings.CCTV_OCR_GPU,
+    }
+
+
+def vote_options():
+    return {
+        'window': settings.CCTV_VOTE_WINDOW,
+        'min_reads': settings.CCTV_VOTE_MIN_READS,
+        'min_agreement': settings.CCTV_VOTE_MIN_AGREEMENT,
+        'cooldown': settings.CCTV_VOTE_COOLDOWN,
+    }
+
+
+def api_sink(spool_path=None):
+    from cctv.spool import PlateSpool
+    from cctv.tasks import ApiSink
+
+    return ApiSink(
+        settings.API_BASE_URL,
+        PlateSpool(spool_path or settings.CCTV_SPOOL_PATH),
+        token=settings.CCTV_API_TOKEN,
+        batch_size=settings.CCTV_SPOOL_BATCH_SIZE,
+    )
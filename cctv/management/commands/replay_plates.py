@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from cctv.conf import api_sink, camera_defaults, ocr_options, vote_options
+from cctv.replay import MeteredSink, replay_lanes
+from cctv.tasks import CameraSupervisor
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a recorded video file or frame directory through the plate pipeline on one or more "
+        "simulated lanes and report throughput, plate latency and API calls per vehicle."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Video file, or directory of frame images played in file-name order")
+        parser.add_argument('--lanes', type=int, default=1, help="Number of lanes replaying the source concurrently")
+        parser.add_argument('--speed', type=float, default=1.0,
+                            help="Playback speed relative to real time; 0 replays as fast as possible")
+        parser.add_argument('--fps', type=float, help="Frame rate of the recording (required for frame directories)")
+        parser.add_argument('--loops', type=int, default=1, help="Times each lane replays the source")
+        parser.add_argument('--parking-space', type=int, action='append', default=[],
+                            help="Parking space id(s) assigned to lanes round-robin")
+        parser.add_argument('--ocr-workers', type=int, help="Number of warm OCR processes shared by all lanes")
+        parser.add_argument('--sink', choices=['none', 'stdout', 'api'], default='none',
+                            help="Where plate events go; 'api' exercises the real check-in endpoint")
+        parser.add_argument('--spool',
+                            help="Spool file for --sink api (default: a temporary one, never the live run_cctv spool)")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.WARNING, format='%(asctime)s %(processName)s %(levelname)s %(message)s')
+
+        if not os.path.exists(options['source']):
+            raise CommandError(f"Source not found: {options['source']}")
+        try:
+            import cv2  # noqa: F401
+        except ImportError as exc:
+            raise CommandError(
+                "Replay decodes frames with OpenCV; install opencv-python-headless (see requirements.txt)"
+            ) from exc
+
+        cameras = replay_lanes(
+            options['source'], options['lanes'], options['fps'], options['speed'], options['loops'],
+            options['parking_space'],
+        )
+        cameras = [{**camera_defaults(), **camera} for camera in cameras]
+
+        spool_dir = None
+        if options['sink'] == 'api':
+            spool_path = options['spool']
+            if spool_path is None:
+                spool_dir = tempfile.mkdtemp(prefix='replay-spool-')
+                spool_path = os.path.join(spool_dir, 'spool.sqlite3')
+            elif os.path.realpath(spool_path) == os.path.realpath(str(settings.CCTV_SPOOL_PATH)):
+                raise CommandError("--spool must not be the live CCTV_SPOOL_PATH drained by run_cctv")
+            sink = MeteredSink(api_sink(spool_path))
+        elif options['sink'] == 'stdout':
+            sink = MeteredSink(lambda event: self.stdout.write(json.dumps(event)))
+        else:
+            sink = MeteredSink()
+
+        supervisor = CameraSupervisor(cameras, sink, ocr_options(options['ocr_workers']), vote_options())
+        started = time.monotonic()
+        supervisor.run()
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(json.dumps(sink.report(supervisor.frame_stats(), elapsed), indent=2))
+        if spool_dir is not None:
+            unsent = len(sink.sink.spool)
+            sink.sink.spool.close()
+            if unsent:
+                self.stderr.write(f"{unsent} event(s) were not uploaded; spool kept at {spool_dir}")
+            else:
+                shutil.rmtree(spool_dir)
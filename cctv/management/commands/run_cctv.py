@@ -0,0 +1,43 @@
+import json
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from cctv.conf import api_sink, camera_defaults, ocr_options, vote_options
+from cctv.tasks import CameraSupervisor
+
+
+class Command(BaseCommand):
+    help = "Run the headless ANPR ingestion service: one decode process per configured camera."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--config', help="JSON file with a list of cameras (defaults to settings.CCTV_CAMERAS)")
+        parser.add_argument('--camera', action='append', default=[],
+                            help="Only run the camera with this id (may be repeated)")
+        parser.add_argument('--ocr-workers', type=int, default=settings.CCTV_OCR_WORKERS,
+                            help="Number of warm OCR processes shared by all cameras")
+        parser.add_argument('--sink', choices=['api', 'stdout'], default='api',
+                            help="Where plate-read events go")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(processName)s %(levelname)s %(message)s')
+
+        if options['config']:
+            with open(options['config']) as f:
+                cameras = json.load(f)
+        else:
+            cameras = settings.CCTV_CAMERAS
+        if options['camera']:
+            cameras = [camera for camera in cameras if camera['id'] in options['camera']]
+        if not cameras:
+            raise CommandError("No cameras configured")
+        cameras = [{**camera_defaults(), **camera} for camera in cameras]
+
+        if options['sink'] == 'stdout':
+            sink = lambda event: self.stdout.write(json.dumps(event))
+        else:
+            sink = api_sink()
+
+        self.stdout.write(f"Supervising {len(cameras)} camera(s) with {options['ocr_workers']} OCR worker(s)")
+        CameraSupervisor(cameras, sink, ocr_options(options['ocr_workers']), vote_options()).run()
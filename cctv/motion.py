@@ -0,0 +1,55 @@
+import time
+
+import numpy as np
+
+
+def crop(frame, roi):
+    """Crop a frame to ``roi`` given as (x0, y0, x1, y1) fractions of its width and height."""
+    if not roi:
+        return frame
+    height, width = frame.shape[:2]
+    x0, y0, x1, y1 = roi
+    return frame[int(y0 * height):int(y1 * height), int(x0 * width):int(x1 * width)]
+
+
+def downscale(gray, factor):
+    """Block-average a grayscale frame by ``factor`` in both directions."""
+    height = gray.shape[0] // factor * factor
+    width = gray.shape[1] // factor * factor
+    blocks = gray[:height, :width].reshape(height // factor, factor, width // factor, factor)
+    return blocks.mean(axis=(1, 3), dtype=np.float32)
+
+
+class MotionGate:
+    """Cheap presence check that decides which frames are worth sending to OCR.
+
+    Each sampled frame is cropped to the plate region of interest,
+    block-averaged down by ``scale`` and compared with the previous one. The
+    frame is forwarded when more than ``min_changed`` of the downscaled
+    pixels moved by over ``pixel_threshold`` grey levels, and for ``hold``
+    seconds afterwards so a car that pulls up and stops still gets read.
+    """
+
+    def __init__(self, roi=None, scale=8, pixel_threshold=25, min_changed=0.02, hold=3.0):
+        self.roi = roi
+        self.scale = scale
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.hold = hold
+        self.previous = None
+        self.open_until = 0.0
+
+    def check(self, gray, now=None):
+        """Return the cropped frame if it should go to OCR, otherwise None."""
+        if now is None:
+            now = time.monotonic()
+        region = crop(gray, self.roi)
+        small = downscale(region, self.scale)
+        previous, self.previous = self.previous, small
+        if previous is not None and previous.shape == small.shape:
+            changed = np.count_nonzero(np.abs(small - previous) > self.pixel_threshold) / small.size
+            if changed >= self.min_changed:
+                self.open_until = now + self.hold
+        if now < self.open_until:
+            return region
+        return None
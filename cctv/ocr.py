@@ -0,0 +1,137 @@
+import logging
+import multiprocessing
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class OCRClient:
+    """Handle camera processes use to hand frames to the OCR pool.
+
+    Frames are copied into a fixed slot of a shared-memory ring instead of
+    being pickled through the queue; only the slot number and frame metadata
+    travel over the pipe. When every slot is in use ``submit`` returns False
+    straight away so the camera drops the frame and tries again with a
+    fresher one, which keeps recognition latency bounded under load.
+    """
+
+    def __init__(self, shm_name, slot_bytes, free_slots, jobs):
+        self.shm_name = shm_name
+        self.slot_bytes = slot_bytes
+        self.free_slots = free_slots
+        self.jobs = jobs
+        self._shm = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shm'] = None
+        return state
+
+    @property
+    def shm(self):
+        if self._shm is None:
+            self._shm = shared_memory.SharedMemory(name=self.shm_name)
+        return self._shm
+
+    def submit(self, frame, camera, captured_at=None, timeout=0):
+        frame = np.ascontiguousarray(frame)
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of {frame.nbytes} bytes does not fit an OCR slot of {self.slot_bytes} bytes")
+        try:
+            slot = self.free_slots.get(timeout=timeout) if timeout else self.free_slots.get_nowait()
+        except queue.Empty:
+            return False
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+        view[...] = frame
+        self.jobs.put((slot, frame.shape, frame.dtype.str, camera, captured_at or time.time()))
+        return True
+
+
+def run_ocr_worker(client, events, stop_event, gpu=False, max_age=2.0):
+    """OCR worker process: loads the easyocr model once and serves frames until stopped."""
+    import easyocr
+    from cctv.tasks import read_plates
+
+    reader = easyocr.Reader(['en'], gpu=gpu)
+    logger.info("OCR worker ready")
+
+    while not stop_event.is_set():
+        try:
+            slot, shape, dtype, camera, captured_at = client.jobs.get(timeout=1)
+        except queue.Empty:
+            continue
+        try:
+            if time.time() - captured_at > max_age:
+                logger.debug(f"Dropping stale frame from camera {camera['id']}")
+                continue
+            frame = np.ndarray(shape, dtype=np.dtype(dtype), buffer=client.shm.buf, offset=slot * client.slot_bytes)
+            for read in read_plates(reader, frame, camera, captured_at):
+                events.put(read)
+        except Exception as e:
+            logger.error(f"OCR failed for camera {camera['id']}: {str(e)}")
+        finally:
+            client.free_slots.put(slot)
+
+
+class OCRPool:
+    """Fixed-size pool of warm OCR processes shared by every camera.
+
+    ``size`` bounds how many frames are recognised in parallel and ``slots``
+    bounds how many may be queued or in flight at once; ``max_age`` drops
+    frames that waited too long to be worth reading.
+    """
+
+    def __init__(self, events, size=2, slots=8, slot_bytes=1920 * 1080, gpu=False, max_age=2.0, context=None):
+        self.context = context or multiprocessing.get_context('spawn')
+        self.events = events
+        self.size = size
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.gpu = gpu
+        self.max_age = max_age
+        self.stop_event = self.context.Event()
+        self.shm = None
+        self.client = None
+        self.workers = []
+
+    def start(self):
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        free_slots = self.context.Queue()
+        for slot in range(self.slots):
+            free_slots.put(slot)
+        self.client = OCRClient(self.shm.name, self.slot_bytes, free_slots, self.context.Queue())
+        self.workers = [self._spawn(i) for i in range(self.size)]
+        logger.info(f"OCR pool started with {self.size} worker(s) and {self.slots} frame slot(s)")
+        return self.client
+
+    def _spawn(self, index):
+        process = self.context.Process(
+            target=run_ocr_worker,
+            args=(self.client, self.events, self.stop_event, self.gpu, self.max_age),
+            name=f"ocr-{index}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def check(self):
+        """Replace any worker that died; called periodically by the supervisor."""
+        for index, process in enumerate(self.workers):
+            if not process.is_alive() and not self.stop_event.is_set():
+                logger.error(f"OCR worker {index} exited with code {process.exitcode}, restarting")
+                self.workers[index] = self._spawn(index)
+
+    def stop(self):
+        self.stop_event.set()
+        for process in self.workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
@@ -0,0 +1,167 @@
+import os
+import time
+
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class DirectoryCapture:
+    """cv2.VideoCapture look-alike over a directory of frame images, in file-name order."""
+
+    def __init__(self, path):
+        self.files = sorted(
+            os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.index = -1
+
+    def isOpened(self):
+        return bool(self.files)
+
+    def grab(self):
+        self.index += 1
+        return self.index < len(self.files)
+
+    def retrieve(self):
+        import cv2
+
+        frame = cv2.imread(self.files[self.index])
+        return frame is not None, frame
+
+    def release(self):
+        pass
+
+
+class ReplayCapture:
+    """Plays a recorded source back as if it were a live camera.
+
+    Frames are paced at ``speed`` times the recording's frame rate (0 means
+    as fast as frames can be decoded) and ``media_time`` reports the
+    position in the recording, so sampling and motion gating behave the
+    same at any replay speed. The source is replayed ``loops`` times and
+    ``grab`` returns False once it is exhausted.
+    """
+
+    def __init__(self, path, fps=None, speed=1.0, loops=1):
+        self.path = path
+        self.speed = speed
+        self.loops = loops
+        self.capture = self._open()
+        self.fps = fps or self._source_fps() or 10.0
+        self.frames = 0
+        self.started = time.monotonic()
+
+    def _open(self):
+        import cv2
+
+        return DirectoryCapture(self.path) if os.path.isdir(self.path) else cv2.VideoCapture(self.path)
+
+    def _source_fps(self):
+        import cv2
+
+        if isinstance(self.capture, DirectoryCapture):
+            return None
+        return self.capture.get(cv2.CAP_PROP_FPS)
+
+    @property
+    def media_time(self):
+        return self.frames / self.fps
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def grab(self):
+        ok = self.capture.grab()
+        while not ok and self.loops > 1:
+            self.loops -= 1
+            self.capture.release()
+            self.capture = self._open()
+            ok = self.capture.grab()
+        if not ok:
+            return False
+        self.frames += 1
+        if self.speed > 0:
+            delay = self.started + self.media_time / self.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return True
+
+    def retrieve(self):
+        return self.capture.retrieve()
+
+    def release(self):
+        self.capture.release()
+
+
+def open_capture(camera):
+    """Open the live stream, or a paced replay when the camera is configured with ``replay``."""
+    replay = camera.get('replay')
+    if replay:
+        return ReplayCapture(camera['stream_url'], replay.get('fps'), replay.get('speed', 1.0), replay.get('loops', 1))
+
+    import cv2
+
+    return cv2.VideoCapture(camera['stream_url'])
+
+
+def replay_lanes(source, lanes, fps=None, speed=1.0, loops=1, parking_space_ids=None):
+    """Build camera configs that replay ``source`` on ``lanes`` simulated lanes at once."""
+    cameras = []
+    for lane in range(lanes):
+        cameras.append({
+            'id': f"replay-{lane + 1}",
+            'stream_url': source,
+            'parking_space_id': parking_space_ids[lane % len(parking_space_ids)] if parking_space_ids else None,
+            'direction': 'entry',
+            'replay': {'fps': fps, 'speed': speed, 'loops': loops},
+        })
+    return cameras
+
+
+class MeteredSink:
+    """Wraps a sink and records plate latency and outbound API calls for the replay report."""
+
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.latencies = []
+        self.api_calls = 0
+        session = getattr(sink, 'session', None)
+        if session is not None:
+            post = session.post
+
+            def counted_post(*args, **kwargs):
+                self.api_calls += 1
+                return post(*args, **kwargs)
+
+            session.post = counted_post
+
+    def __call__(self, event):
+        self.latencies.append(time.time() - event['captured_at'])
+        if self.sink is not None:
+            self.sink(event)
+
+    def flush(self):
+        if hasattr(self.sink, 'flush'):
+            self.sink.flush()
+
+    def report(self, stats, elapsed):
+        """Summarise a replay run; ``stats`` maps camera id to its frame counters."""
+        grabbed = sum(counters['grabbed'] for counters in stats.values())
+        vehicles = len(self.latencies)
+        latencies = np.array(self.latencies or [0.0])
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        return {
+            'elapsed_seconds': round(elapsed, 2),
+            'lanes': len(stats),
+            'frames': grabbed,
+            'frames_per_second': round(grabbed / elapsed, 1) if elapsed else 0.0,
+            'frames_sampled': sum(counters['sampled'] for counters in stats.values()),
+            'frames_to_ocr': sum(counters['forwarded'] for counters in stats.values()),
+            'frames_dropped_busy': sum(counters['dropped'] for counters in stats.values()),
+            'vehicles': vehicles,
+            'plate_latency_p50': round(float(p50), 3),
+            'plate_latency_p90': round(float(p90), 3),
+            'plate_latency_p99': round(float(p99), 3),
+            'api_calls': self.api_calls,
+            'api_calls_per_vehicle': round(self.api_calls / vehicles, 2) if vehicles else 0.0,
+        }
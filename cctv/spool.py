@@ -0,0 +1,46 @@
+import json
+import sqlite3
+import time
+
+
+class PlateSpool:
+    """Durable, ordered local queue of plate events backed by SQLite in WAL mode.
+
+    Events are committed before any network call is made, so a gate keeps
+    logging entries through API outages and restarts; they are replayed in
+    arrival order once the API is reachable again. Only the supervisor
+    process writes to the spool.
+    """
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(str(path), isolation_level=None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=FULL')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS events ('
+            ' seq INTEGER PRIMARY KEY AUTOINCREMENT,'
+            ' event_id TEXT NOT NULL UNIQUE,'
+            ' payload TEXT NOT NULL,'
+            ' spooled_at REAL NOT NULL)'
+        )
+
+    def append(self, event):
+        self.db.execute(
+            'INSERT OR IGNORE INTO events (event_id, payload, spooled_at) VALUES (?, ?, ?)',
+            (event['event_id'], json.dumps(event), time.time()),
+        )
+
+    def peek(self, limit):
+        """Return up to ``limit`` of the oldest events as (seq, event) pairs."""
+        rows = self.db.execute('SELECT seq, payload FROM events ORDER BY seq LIMIT ?', (limit,))
+        return [(seq, json.loads(payload)) for seq, payload in rows]
+
+    def ack(self, last_seq):
+        """Drop every event up to and including ``last_seq``."""
+        self.db.execute('DELETE FROM events WHERE seq <= ?', (last_seq,))
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+
+    def close(self):
+        self.db.close()
@@ -1,40 +1,296 @@
-# import time
-# import cv2
-# import easyocr
-# import requests
-# from django.conf import settings
-#
-# def process_frame(frame, parking_space_id):
-#     reader = easyocr.Reader(['en'])
-#     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-#     results = reader.readtext(gray)
-#     for (bbox, text, prob) in results:
-#         if prob > 0.7:
-#             number_plate = text.upper().replace(' ', '')
-#             response = requests.post(
-#                 f"{settings.API_BASE_URL}/api/check-number-plate/",
-#                 json={'number_plate': number_plate, 'parking_space_id': parking_space_id}
-#             )
-#             return response.json()
-#     return {'status': 'no_plate', 'message': 'No number plate detected'}
-#
-# def run_cctv(stream_url, parking_space_id):
-#     cap = cv2.VideoCapture(stream_url)
-#     if not cap.isOpened():
-#         print("Error: Could not open video stream")
-#         return
-#
-#     while True:
-#         ret, frame = cap.read()
-#         if not ret:
-#             print("Error: Failed to capture frame")
-#             break
-#         result = process_frame(frame, parking_space_id)
-#         print(result)
-#         cv2.imshow('Frame', frame)
-#         if cv2.waitKey(1) & 0xFF == ord('q'):
-#             break
-#         time.sleep(5)
-#
-#     cap.release()
-#     cv2.destroyAllWindows()
\ No newline at end of file
+import hashlib
+import logging
+import multiprocessing
+import queue
+import re
+import time
+import uuid
+
+import requests
+
+from cctv.motion import MotionGate
+from cctv.ocr import OCRPool
+from cctv.replay import open_capture
+from cctv.voting import PlateVoter
+
+logger = logging.getLogger(__name__)
+
+# Per-camera frame counters shared with the supervisor
+GRABBED, SAMPLED, FORWARDED, DROPPED = range(4)
+STAT_NAMES = ('grabbed', 'sampled', 'forwarded', 'dropped')
+
+PLATE_PATTERN = re.compile(r'^[A-Z0-9]{5,8}$')
+
+
+def normalize_plate(text):
+    """Uppercase an OCR string and strip everything that is not a plate character."""
+    return re.sub(r'[^A-Z0-9]', '', (text or '').upper())
+
+
+def make_plate_read(camera, number_plate, confidence, captured_at=None):
+    """Build a normalized plate-read event.
+
+    Events are plain dicts so they pickle across process boundaries and
+    serialize straight into API payloads.
+    """
+    return {
+        'event_id': uuid.uuid4().hex,
+        'camera_id': camera['id'],
+        'parking_space_id': camera.get('parking_space_id'),
+        'parking_lot_id': camera.get('parking_lot_id'),
+        'direction': camera.get('direction', 'entry'),
+        'number_plate': number_plate,
+        'confidence': round(float(confidence), 3),
+        'captured_at': captured_at or time.time(),
+    }
+
+
+def read_plates(reader, gray, camera, captured_at=None):
+    reads = []
+    for _, text, prob in reader.readtext(gray):
+        number_plate = normalize_plate(text)
+        if prob >= camera['min_confidence'] and PLATE_PATTERN.match(number_plate):
+            reads.append(make_plate_read(camera, number_plate, prob, captured_at))
+    return reads
+
+
+def run_camera(camera, ocr, stop_event, stats):
+    """Decode loop for a single camera, run in its own process.
+
+    Frames are grabbed continuously so the stream buffer never lags behind
+    real time; only one frame every ``sample_interval`` seconds is decoded,
+    and only frames where the plate region changed are handed to the shared
+    OCR pool. Replay cameras (see ``cctv.replay``) run on recording time and
+    exit once the recording ends instead of reconnecting.
+    """
+    import cv2
+
+    replay = bool(camera.get('replay'))
+    gate = MotionGate(
+        roi=camera.get('roi'),
+        pixel_threshold=camera['motion_threshold'],
+        min_changed=camera['motion_min_changed'],
+        hold=camera['motion_hold'],
+    )
+    logger.info(f"Camera {camera['id']} ready")
+
+    while not stop_event.is_set():
+        cap = open_capture(camera)
+        if not cap.isOpened():
+            logger.error(f"Camera {camera['id']}: could not open stream {camera['stream_url']}")
+            stop_event.wait(camera['reconnect_delay'])
+            continue
+
+        last_sample = float('-inf')
+        while not stop_event.is_set():
+            if not cap.grab():
+                if replay:
+                    logger.info(f"Camera {camera['id']}: replay finished")
+                    cap.release()
+                    return
+                logger.warning(f"Camera {camera['id']}: stream dropped, reconnecting")
+                break
+            stats[GRABBED] += 1
+            now = cap.media_time if replay else time.monotonic()
+            if now - last_sample < camera['sample_interval']:
+                continue
+            last_sample = now
+            ok, frame = cap.retrieve()
+            if not ok:
+                continue
+            stats[SAMPLED] += 1
+            region = gate.check(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), now)
+            if region is None:
+                continue
+            if ocr.submit(region, camera):
+                stats[FORWARDED] += 1
+            else:
+                stats[DROPPED] += 1
+                logger.debug(f"Camera {camera['id']}: OCR pool busy, frame dropped")
+
+        cap.release()
+        stop_event.wait(camera['reconnect_delay'])
+
+
+class CameraSupervisor:
+    """Runs one decode process per camera and fans their plate reads into a single sink.
+
+    Cameras share one warm OCR pool (see ``cctv.ocr``) and raw reads are
+    voted per camera (see ``cctv.voting``) so the sink sees one event per
+    vehicle rather than one per frame. Dead workers are restarted with
+    exponential backoff so a flapping camera never takes the other gates
+    down with it.
+    """
+
+    def __init__(self, cameras, sink, ocr_options=None, vote_options=None, max_restart_delay=60):
+        self.context = multiprocessing.get_context('spawn')
+        self.cameras = {camera['id']: camera for camera in cameras}
+        self.sink = sink
+        self.max_restart_delay = max_restart_delay
+        self.events = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.ocr_pool = OCRPool(self.events, context=self.context, **(ocr_options or {}))
+        self.ocr = None
+        self.voter = PlateVoter(**(vote_options or {}))
+        self.stats = {camera_id: self.context.Array('q', len(STAT_NAMES), lock=False) for camera_id in self.cameras}
+        self.workers = {}
+        self.restarts = {}
+
+    def _start(self, camera_id):
+        process = self.context.Process(
+            target=run_camera,
+            args=(self.cameras[camera_id], self.ocr, self.stop_event, self.stats[camera_id]),
+            name=f"cctv-{camera_id}",
+            daemon=True,
+        )
+        process.start()
+        self.workers[camera_id] = process
+        logger.info(f"Started camera worker {camera_id} (pid {process.pid})")
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for camera_id, process in list(self.workers.items()):
+            if process.is_alive():
+                continue
+            if process.exitcode == 0 and self.cameras[camera_id].get('replay'):
+                del self.workers[camera_id]
+                continue
+            attempts, restart_at = self.restarts.get(camera_id, (0, None))
+            if restart_at is None:
+                delay = min(2 ** attempts, self.max_restart_delay)
+                logger.error(f"Camera worker {camera_id} exited with code {process.exitcode}, restarting in {delay}s")
+                self.restarts[camera_id] = (attempts + 1, now + delay)
+            elif now >= restart_at:
+                self.restarts[camera_id] = (attempts, None)
+                self._start(camera_id)
+
+    def run(self):
+        """Supervise until interrupted, or until every replay camera has finished."""
+        self.ocr = self.ocr_pool.start()
+        for camera_id in self.cameras:
+            self._start(camera_id)
+        drain_until = None
+        try:
+            while drain_until is None or time.monotonic() < drain_until:
+                try:
+                    event = self.events.get(timeout=0.25)
+                except queue.Empty:
+                    event = None
+                if event is not None:
+                    self.voter.add(event)
+                for plate_event in self.voter.flush():
+                    self.sink(plate_event)
+                if hasattr(self.sink, 'flush'):
+                    self.sink.flush()
+                self._check_workers()
+                self.ocr_pool.check()
+                if not self.workers and drain_until is None:
+                    # Let frames already queued for OCR come back before stopping
+                    drain_until = time.monotonic() + self.ocr_pool.max_age + 1
+            for plate_event in self.voter.drain():
+                self.sink(plate_event)
+            if hasattr(self.sink, 'flush'):
+                self.sink.flush()
+        except KeyboardInterrupt:
+            logger.info("Stopping camera workers")
+        finally:
+            self.stop()
+
+    def frame_stats(self):
+        return {
+            camera_id: dict(zip(STAT_NAMES, counters[:])) for camera_id, counters in self.stats.items()
+        }
+
+    def stop(self):
+        self.stop_event.set()
+        for process in self.workers.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.ocr_pool.stop()
+
+
+class ApiSink:
+    """Store-and-forward sink for the batch entry and exit endpoints.
+
+    Every event is committed to the local spool first; ``flush`` then
+    uploads the spool in order, in batches, and only acknowledges events
+    once the API has accepted them. While the API is unreachable uploads
+    back off exponentially and events keep accumulating on disk. Each event
+    carries its ``event_id`` so the server can drop replays instead of
+    checking the same car in twice.
+    """
+
+    def __init__(self, base_url, spool, token=None, timeout=10, batch_size=100, max_backoff=60):
+        self.urls = {
+            'entry': f"{base_url.rstrip('/')}/api/check-number-plate/batch/",
+            'exit': f"{base_url.rstrip('/')}/api/exit-vehicle/batch/",
+        }
+        self.spool = spool
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self.retry_at = 0.0
+        self.session = requests.Session()
+        self.session.headers['Content-Type'] = 'application/json'
+        if token:
+            self.session.headers['Authorization'] = f"Bearer {token}"
+
+    def __call__(self, event):
+        self.spool.append(event)
+
+    def flush(self):
+        if time.monotonic() < self.retry_at:
+            return
+        while True:
+            rows = self.spool.peek(self.batch_size)
+            if not rows:
+                return
+            if not self._upload([event for _, event in rows]):
+                self.failures += 1
+                delay = min(2 ** self.failures, self.max_backoff)
+                self.retry_at = time.monotonic() + delay
+                logger.warning(f"Plate upload failed, {len(self.spool)} event(s) spooled, retrying in {delay}s")
+                return
+            self.failures = 0
+            self.spool.ack(rows[-1][0])
+
+    def _upload(self, events):
+        """Send one spooled batch; True means the events may be dropped from the spool."""
+        by_direction = {}
+        for event in events:
+            by_direction.setdefault(event.get('direction', 'entry'), []).append(event)
+
+        for direction, batch in by_direction.items():
+            url = self.urls.get(direction)
+            if url is None:
+                logger.error(f"No endpoint for {direction} events, dropping {len(batch)} event(s)")
+                continue
+            payload = {'events': [
+                {
+                    'event_id': event['event_id'],
+                    'number_plate': event['number_plate'],
+                    'parking_space_id': event['parking_space_id'],
+                    'parking_lot_id': event.get('parking_lot_id'),
+                    'timestamp': event['captured_at'],
+                } for event in batch
+            ]}
+            idempotency_key = hashlib.sha256(''.join(event['event_id'] for event in batch).encode()).hexdigest()
+            try:
+                response = self.session.post(
+                    url, json=payload, headers={'Idempotency-Key': idempotency_key}, timeout=self.timeout
+                )
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Failed to upload {len(batch)} {direction} event(s): {str(e)}")
+                return False
+            if response.status_code == 400:
+                # The batch itself is malformed; retrying would block the spool forever
+                logger.error(f"Dropping {len(batch)} {direction} event(s) [{response.status_code}]: {response.text}")
+                continue
+            if response.status_code >= 400:
+                # Auth, throttling, conflicts and server errors all clear up; keep the events spooled
+                logger.error(f"Upload of {len(batch)} {direction} event(s) rejected [{response.status_code}]: {response.text}")
+                return False
+            logger.info(f"Uploaded {len(batch)} {direction} event(s): {response.text}")
+        return True
@@ -0,0 +1,100 @@
+import logging
+import time
+import uuid
+from collections import Counter, defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+def vote(reads):
+    """Return (plate, agreement) for a burst of reads of the same vehicle.
+
+    Reads are grouped by their most common (confidence-weighted) length and
+    every character position is voted on separately, so a plate that OCR
+    misreads by a single character in a few frames still converges on the
+    right string. Agreement is the mean winning share per position, scaled
+    by the weight of reads that had the winning length (0-1).
+    """
+    lengths = Counter()
+    for read in reads:
+        lengths[len(read['number_plate'])] += read['confidence']
+    length = lengths.most_common(1)[0][0]
+    candidates = [read for read in reads if len(read['number_plate']) == length]
+
+    plate = []
+    shares = []
+    for position in range(length):
+        weights = Counter()
+        for read in candidates:
+            weights[read['number_plate'][position]] += read['confidence']
+        char, weight = weights.most_common(1)[0]
+        plate.append(char)
+        shares.append(weight / sum(weights.values()))
+    agreement = sum(shares) / length * lengths[length] / sum(lengths.values())
+    return ''.join(plate), agreement
+
+
+class PlateVoter:
+    """Per-camera sliding-window aggregator for plate reads.
+
+    The first read from a camera opens a window of ``window`` seconds; every
+    read that lands in it is collected and, once it closes, voted into a
+    single event. The same plate is then suppressed on that camera for
+    ``cooldown`` seconds so a car idling at the barrier does not check in
+    again on every frame.
+    """
+
+    def __init__(self, window=1.5, min_reads=2, min_agreement=0.6, cooldown=30):
+        self.window = window
+        self.min_reads = min_reads
+        self.min_agreement = min_agreement
+        self.cooldown = cooldown
+        self.pending = defaultdict(list)
+        self.recent = {}
+
+    def add(self, read):
+        self.pending[read['camera_id']].append(read)
+
+    def flush(self, now=None):
+        """Close every window older than ``window`` and return the events they produce."""
+        now = now or time.time()
+        emitted = []
+        for camera_id, reads in list(self.pending.items()):
+            if now - reads[0]['captured_at'] < self.window:
+                continue
+            del self.pending[camera_id]
+            event = self._decide(camera_id, reads, now)
+            if event is not None:
+                emitted.append(event)
+        return emitted
+
+    def drain(self):
+        """Close every open window regardless of age (used when ingestion stops)."""
+        emitted = []
+        for camera_id, reads in list(self.pending.items()):
+            del self.pending[camera_id]
+            event = self._decide(camera_id, reads, reads[-1]['captured_at'])
+            if event is not None:
+                emitted.append(event)
+        return emitted
+
+    def _decide(self, camera_id, reads, now):
+        plate, agreement = vote(reads)
+        if len(reads) < self.min_reads or agreement < self.min_agreement:
+            logger.debug(f"Camera {camera_id}: discarded {len(reads)} read(s), best {plate} at {agreement:.2f}")
+            return None
+
+        last_plate, last_seen = self.recent.get(camera_id, (None, 0))
+        self.recent[camera_id] = (plate, now)
+        if plate == last_plate and now - last_seen < self.cooldown:
+            return None
+
+        best = max(reads, key=lambda read: read['confidence'])
+        return {
+            **best,
+            'event_id': uuid.uuid4().hex,
+            'number_plate': plate,
+            'confidence': round(agreement, 3),
+            'captured_at': reads[0]['captured_at'],
+            'votes': len(reads),
+        }
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 from datetime import timedelta
+from decimal import Decimal
 
 import environ
 
@@ -38,6 +39,19 @@ DATABASES = {
     'default': dj_database_url.parse(DATABASE_URL, conn_max_age=600, ssl_require=True)
 }
 
+# Shared cache for in-memory lookup structures and their invalidation counters.
+# Set REDIS_URL (and install `redis`) so every worker process sees the same cache.
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}
+    }
+else:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    }
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -209,5 +223,70 @@ BREVO_WELCOME_TEMPLATE_ID = int(os.getenv('BREVO_WELCOME_TEMPLATE_ID'))
 AUTH_USER_MODEL = 'users.User'
 
 CLIENT_TILL_NUMBER = "174379"
-PAYMENTS_API_URL = "https://inoseekpay.vercel.app"
-PAYMENT_CALLBACK_URL = "http://127.0.0.1:8000"
\ No newline at end of file
+PAYMENTS_API_URL = os.getenv('PAYMENTS_API_URL', "https://inoseekpay.vercel.app")  # `manage.py run_fake_payments` for load tests
+PAYMENTS_API_TIMEOUT = 10  # seconds
+PAYMENTS_API_RETRIES = int(os.getenv('PAYMENTS_API_RETRIES', '2'))  # only for requests the provider never acted on
+PAYMENTS_API_POOL_SIZE = int(os.getenv('PAYMENTS_API_POOL_SIZE', '10'))  # keep-alive connections per process
+PAYMENTS_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('PAYMENTS_CIRCUIT_FAILURE_THRESHOLD', '5'))  # consecutive failures
+PAYMENTS_CIRCUIT_RESET_TIMEOUT = float(os.getenv('PAYMENTS_CIRCUIT_RESET_TIMEOUT', '30'))  # seconds to fail fast
+
+# Payment outbox (see `manage.py dispatch_payments`)
+PAYMENT_OUTBOX_BATCH_SIZE = int(os.getenv('PAYMENT_OUTBOX_BATCH_SIZE', '50'))
+PAYMENT_OUTBOX_MAX_ATTEMPTS = int(os.getenv('PAYMENT_OUTBOX_MAX_ATTEMPTS', '8'))
+PAYMENT_OUTBOX_MAX_DELAY = float(os.getenv('PAYMENT_OUTBOX_MAX_DELAY', '300'))  # seconds between retries, at most
+PAYMENT_OUTBOX_POLL_INTERVAL = float(os.getenv('PAYMENT_OUTBOX_POLL_INTERVAL', '1'))
+
+# Payment callback inbox (see `manage.py process_payment_callbacks`)
+PAYMENT_CALLBACK_BATCH_SIZE = int(os.getenv('PAYMENT_CALLBACK_BATCH_SIZE', '200'))
+PAYMENT_CALLBACK_POLL_INTERVAL = float(os.getenv('PAYMENT_CALLBACK_POLL_INTERVAL', '1'))
+
+# Pending payment reconciliation (see `manage.py reconcile_payments`)
+PAYMENTS_STATUS_PATH = '/api/v1/payments/status/'  # bulk status lookup: {"order_ids": [...]}
+PAYMENT_RECONCILE_CHUNK_SIZE = int(os.getenv('PAYMENT_RECONCILE_CHUNK_SIZE', '200'))
+PAYMENT_RECONCILE_AFTER = int(os.getenv('PAYMENT_RECONCILE_AFTER', '600'))  # seconds to wait for a callback first
+PAYMENT_RECONCILE_EXPIRE_AFTER = int(os.getenv('PAYMENT_RECONCILE_EXPIRE_AFTER', '86400'))  # fail orders the provider never saw
+PAYMENT_CALLBACK_URL = os.getenv('PAYMENT_CALLBACK_URL', "http://127.0.0.1:8000")
+LOCAL_TIME_ZONE = os.getenv('LOCAL_TIME_ZONE', 'Africa/Nairobi')  # business days and tariff clock hours
+
+# Used for lots without their own parking_lots.Tariff (see that model for the format)
+DEFAULT_TARIFF = {
+    'grace_minutes': 10,
+    'hourly_bands': [[None, '100.00']],
+    'daily_cap': '1000.00',
+}
+MINIMUM_PARKING_BALANCE = Decimal(os.getenv('MINIMUM_PARKING_BALANCE', '100.00'))
+CYYKS_COMMISSION_RATE = Decimal(os.getenv('CYYKS_COMMISSION_RATE', '0.15'))  # platform share of each settled fee
+CHECK_NUMBER_PLATE_BATCH_LIMIT = int(os.getenv('CHECK_NUMBER_PLATE_BATCH_LIMIT', '500'))
+EXIT_VEHICLE_BATCH_LIMIT = int(os.getenv('EXIT_VEHICLE_BATCH_LIMIT', '200'))  # exits are applied one transaction each
+PLATE_INDEX_ALLOW_LOCAL_CACHE = env.bool('PLATE_INDEX_ALLOW_LOCAL_CACHE', default=DEBUG)  # single-process only; otherwise set REDIS_URL
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', '86400'))  # seconds a response is replayed for its Idempotency-Key
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv('IDEMPOTENCY_LOCK_TIMEOUT', '60'))  # seconds a first attempt may run before a retry takes over
+BALANCE_SNAPSHOT_LAG = int(os.getenv('BALANCE_SNAPSHOT_LAG', '300'))  # seconds balance snapshots trail the ledger
+KPI_SNAPSHOT_TTL = int(os.getenv('KPI_SNAPSHOT_TTL', '60'))  # seconds a dashboard KPI snapshot is served at most
+KPI_SNAPSHOT_MIN_INTERVAL = int(os.getenv('KPI_SNAPSHOT_MIN_INTERVAL', '5'))  # seconds between rebuilds of a busy scope
+DWELL_STATS_CACHE_TTL = int(os.getenv('DWELL_STATS_CACHE_TTL', '900'))  # seconds a dwell-time report is cached per range
+
+# CCTV / ANPR ingestion (see `manage.py run_cctv`)
+# CCTV_CAMERAS is a JSON list, e.g.
+# [{"id": "gate-1-in", "stream_url": "rtsp://...", "parking_space_id": 1, "direction": "entry",
+#   "roi": [0.25, 0.5, 0.75, 1.0]}]
+# "roi" crops OCR to the plate area as (x0, y0, x1, y1) fractions of the frame.
+# Exit cameras use "direction": "exit" and may give "parking_lot_id" instead of a space.
+CCTV_CAMERAS = env.json('CCTV_CAMERAS', default=[])
+CCTV_SAMPLE_INTERVAL = float(os.getenv('CCTV_SAMPLE_INTERVAL', '0.5'))  # seconds between OCR'd frames
+CCTV_MIN_CONFIDENCE = float(os.getenv('CCTV_MIN_CONFIDENCE', '0.7'))
+CCTV_RECONNECT_DELAY = float(os.getenv('CCTV_RECONNECT_DELAY', '5'))
+CCTV_API_TOKEN = os.getenv('CCTV_API_TOKEN')
+CCTV_SPOOL_PATH = os.getenv('CCTV_SPOOL_PATH', str(BASE_DIR / 'cctv_spool.sqlite3'))  # store-and-forward queue
+CCTV_SPOOL_BATCH_SIZE = int(os.getenv('CCTV_SPOOL_BATCH_SIZE', '100'))
+CCTV_MOTION_THRESHOLD = int(os.getenv('CCTV_MOTION_THRESHOLD', '25'))  # grey levels a pixel must move
+CCTV_MOTION_MIN_CHANGED = float(os.getenv('CCTV_MOTION_MIN_CHANGED', '0.02'))  # share of pixels that must move
+CCTV_MOTION_HOLD = float(os.getenv('CCTV_MOTION_HOLD', '3'))  # seconds to keep reading after motion stops
+CCTV_OCR_WORKERS = int(os.getenv('CCTV_OCR_WORKERS', '2'))  # warm easyocr processes shared by all cameras
+CCTV_OCR_SLOTS = int(os.getenv('CCTV_OCR_SLOTS', '8'))  # frames queued or in flight before cameras drop frames
+CCTV_OCR_MAX_AGE = float(os.getenv('CCTV_OCR_MAX_AGE', '2'))  # seconds a queued frame stays worth reading
+CCTV_OCR_GPU = os.getenv('CCTV_OCR_GPU', 'False') == 'True'
+CCTV_VOTE_WINDOW = float(os.getenv('CCTV_VOTE_WINDOW', '1.5'))  # seconds of reads voted into one event
+CCTV_VOTE_MIN_READS = int(os.getenv('CCTV_VOTE_MIN_READS', '2'))
+CCTV_VOTE_MIN_AGREEMENT = float(os.getenv('CCTV_VOTE_MIN_AGREEMENT', '0.6'))
+CCTV_VOTE_COOLDOWN = float(os.getenv('CCTV_VOTE_COOLDOWN', '30'))  # suppress repeats of the same plate per camera
@@ -1,9 +1,10 @@
 from django.contrib import admin
 
-from parking_lots.models import ParkingLot, ParkingSpace
+from parking_lots.models import ParkingLot, ParkingSpace, Tariff
 
 # Register your models here.
 admin.site.register(ParkingLot)
 admin.site.register(ParkingSpace)
+admin.site.register(Tariff)
 
 
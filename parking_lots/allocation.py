@@ -0,0 +1,21 @@
+from parking_lots.models import ParkingSpace
+from parking_lots.occupancy import occupy
+
+
+def allocate_space(parking_lot_id):
+    """Claim any free space in a lot and mark it occupied; must run inside transaction.atomic().
+
+    Free rows are locked with SKIP LOCKED, so concurrent entries to the same
+    lot each take a different space instead of queueing on one row. Returns
+    None when the lot is full.
+    """
+    parking_space = ParkingSpace.objects.select_for_update(skip_locked=True).filter(
+        parking_lot_id=parking_lot_id, is_occupied=False
+    ).order_by('id').first()
+    if parking_space is None:
+        return None
+
+    parking_space.is_occupied = True
+    ParkingSpace.objects.filter(id=parking_space.id).update(is_occupied=True)
+    occupy(parking_lot_id)
+    return parking_space
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ParkingLotsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'parking_lots'
+
+    def ready(self):
+        from parking_lots import signals  # noqa: F401
@@ -0,0 +1,25 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from parking_lots.occupancy import reconcile
+
+
+class Command(BaseCommand):
+    help = "Repair per-lot space and occupancy counters that drifted from the parking spaces table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, action='append', help="Only reconcile this lot (may be repeated)")
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Keep running, reconciling every this many seconds (default: once)")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+        while True:
+            repaired = reconcile(options['lot'])
+            self.stdout.write(f"Reconciled occupancy, {len(repaired)} lot(s) repaired")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
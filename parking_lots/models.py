@@ -7,6 +7,10 @@ class ParkingLot(models.Model):
     total_spaces = models.PositiveIntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
     client = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='parking_lots', null=True, blank=True)
+    # Denormalised from ParkingSpace and kept current by parking_lots.occupancy;
+    # `manage.py reconcile_occupancy` repairs any drift
+    space_count = models.PositiveIntegerField(default=0, editable=False)
+    occupied_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
@@ -21,4 +25,27 @@ class ParkingSpace(models.Model):
         unique_together = ('parking_lot', 'space_number')
 
     def __str__(self):
-        return f"{self.parking_lot.name} - {self.space_number}"
\ No newline at end of file
+        return f"{self.parking_lot.name} - {self.space_number}"
+
+class Tariff(models.Model):
+    """
+    Rate table for a parking lot. Compiled into lookup tables by
+    parking_transactions.tariffs and cached in memory per process.
+
+    hourly_bands is a list of [up_to_hour, rate_per_hour] pairs counted from
+    the start of each 24 hour block, e.g. [[2, "50.00"], [null, "100.00"]]
+    charges 50/h for the first two hours and 100/h after that. Every started
+    hour is charged; night_rate replaces the band rate for hours that start
+    between night_start and night_end, and daily_cap bounds each 24 hours.
+    """
+    parking_lot = models.OneToOneField(ParkingLot, on_delete=models.CASCADE, related_name='tariff')
+    grace_minutes = models.PositiveIntegerField(default=10)
+    hourly_bands = models.JSONField(default=list)
+    daily_cap = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    night_rate = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    night_start = models.TimeField(null=True, blank=True)
+    night_end = models.TimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Tariff for {self.parking_lot.name}"
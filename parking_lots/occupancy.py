@@ -0,0 +1,66 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+
+from parking_lots.models import ParkingLot, ParkingSpace
+from parking_transactions.kpis import invalidate_kpis
+
+logger = logging.getLogger(__name__)
+
+
+def occupy(parking_lot_id, count=1):
+    """Count ``count`` more occupied spaces in a lot.
+
+    Runs as a single UPDATE ... SET occupied_count = occupied_count + n, so
+    call it last in the entry transaction to hold the lot row lock briefly.
+    """
+    ParkingLot.objects.filter(id=parking_lot_id).update(occupied_count=F('occupied_count') + count)
+    invalidate_kpis(parking_lot_id)
+
+
+def vacate(parking_lot_id, count=1):
+    ParkingLot.objects.filter(id=parking_lot_id).update(occupied_count=Greatest(F('occupied_count') - count, 0))
+    invalidate_kpis(parking_lot_id)
+
+
+def add_spaces(parking_lot_id, count=1):
+    ParkingLot.objects.filter(id=parking_lot_id).update(space_count=F('space_count') + count)
+    invalidate_kpis(parking_lot_id)
+
+
+def remove_spaces(parking_lot_id, count=1):
+    ParkingLot.objects.filter(id=parking_lot_id).update(space_count=Greatest(F('space_count') - count, 0))
+    invalidate_kpis(parking_lot_id)
+
+
+def reconcile(parking_lot_ids=None):
+    """Repair lots whose counters drifted from their spaces; returns the repaired lot ids.
+
+    Drift is found with one grouped query; each drifted lot is then locked
+    and recounted so entries and exits racing the check are not lost.
+    """
+    lots = ParkingLot.objects.annotate(
+        actual_spaces=Count('parkingspace'),
+        actual_occupied=Count('parkingspace', filter=Q(parkingspace__is_occupied=True)),
+    ).exclude(space_count=F('actual_spaces'), occupied_count=F('actual_occupied'))
+    if parking_lot_ids is not None:
+        lots = lots.filter(id__in=parking_lot_ids)
+
+    repaired = []
+    for parking_lot_id in lots.values_list('id', flat=True):
+        with transaction.atomic():
+            lot = ParkingLot.objects.select_for_update().get(id=parking_lot_id)
+            spaces = ParkingSpace.objects.filter(parking_lot_id=parking_lot_id)
+            space_count = spaces.count()
+            occupied_count = spaces.filter(is_occupied=True).count()
+            if (lot.space_count, lot.occupied_count) != (space_count, occupied_count):
+                logger.warning(
+                    f"Occupancy drift in lot {parking_lot_id}: spaces {lot.space_count} -> {space_count}, "
+                    f"occupied {lot.occupied_count} -> {occupied_count}"
+                )
+                ParkingLot.objects.filter(id=parking_lot_id).update(space_count=space_count, occupied_count=occupied_count)
+                invalidate_kpis(parking_lot_id, lot.client_id)
+                repaired.append(parking_lot_id)
+    return repaired
@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from parking_lots.models import ParkingLot, ParkingSpace, Tariff
+from parking_lots.occupancy import add_spaces, occupy, remove_spaces, vacate
+from parking_transactions.kpis import invalidate_lot
+from parking_transactions.tariffs import invalidate_tariffs
+
+
+@receiver(post_save, sender=Tariff)
+@receiver(post_delete, sender=Tariff)
+def tariff_changed(sender, **kwargs):
+    invalidate_tariffs()
+
+
+@receiver(post_save, sender=ParkingLot)
+@receiver(post_delete, sender=ParkingLot)
+def parking_lot_changed(sender, instance, **kwargs):
+    invalidate_lot(instance.id, instance.client_id)
+
+
+# Entries and exits update occupied_count themselves, inside their own transactions
+
+@receiver(post_save, sender=ParkingSpace)
+def parking_space_saved(sender, instance, created, **kwargs):
+    if created:
+        add_spaces(instance.parking_lot_id)
+        if instance.is_occupied:
+            occupy(instance.parking_lot_id)
+
+
+@receiver(post_delete, sender=ParkingSpace)
+def parking_space_deleted(sender, instance, **kwargs):
+    remove_spaces(instance.parking_lot_id)
+    if instance.is_occupied:
+        vacate(instance.parking_lot_id)
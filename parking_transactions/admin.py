@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from parking_transactions.models import ParkingTransaction
+from parking_transactions.models import DailyRevenueRollup, HourlyOccupancy, ParkingTransaction
 
 # Register your models here.
 admin.site.register(ParkingTransaction)
+admin.site.register(DailyRevenueRollup)
+admin.site.register(HourlyOccupancy)
@@ -0,0 +1,89 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+KPI_SNAPSHOT_KEY = 'parking_transactions:kpis:{}'
+KPI_VERSION_KEY = 'parking_transactions:kpis-version:{}'
+KPI_REBUILD_LOCK_KEY = 'parking_transactions:kpis-rebuild:{}'
+LOT_CLIENT_KEY = 'parking_transactions:lot-client:{}'
+
+COMPANY_SCOPE = 'company'
+
+
+def client_scope(client_id, parking_lot_id=None):
+    if parking_lot_id is None:
+        return f'client:{client_id}'
+    return f'client:{client_id}:lot:{parking_lot_id}'
+
+
+def lot_client_id(parking_lot_id):
+    """Owner of a lot, cached until the lot is saved or deleted."""
+    from parking_lots.models import ParkingLot
+
+    return cache.get_or_set(
+        LOT_CLIENT_KEY.format(parking_lot_id),
+        lambda: ParkingLot.objects.filter(id=parking_lot_id).values_list('client_id', flat=True).first(),
+        timeout=None,
+    )
+
+
+def invalidate_kpis(parking_lot_id, client_id=None):
+    """Mark the company, client and lot snapshots touched by an event in a lot stale once it commits."""
+    if client_id is None:
+        client_id = lot_client_id(parking_lot_id)
+    scopes = [COMPANY_SCOPE, client_scope(client_id), client_scope(client_id, parking_lot_id)]
+    keys = [KPI_VERSION_KEY.format(scope) for scope in scopes]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_transactions(parking_txns):
+    """invalidate_kpis for every lot the given sessions were parked in, looking the lots up in one query."""
+    from parking_lots.models import ParkingSpace
+
+    space_ids = {parking_txn.parking_space_id for parking_txn in parking_txns if parking_txn.parking_space_id}
+    if not space_ids:
+        return
+    lots = ParkingSpace.objects.filter(id__in=space_ids).values_list('parking_lot_id', 'parking_lot__client_id').distinct()
+    for parking_lot_id, client_id in lots:
+        invalidate_kpis(parking_lot_id, client_id)
+
+
+def invalidate_lot(parking_lot_id, client_id=None):
+    cache.delete(LOT_CLIENT_KEY.format(parking_lot_id))
+    invalidate_kpis(parking_lot_id, client_id)
+
+
+def kpi_snapshot(scope, build):
+    """Dashboard payload for ``scope``, rebuilt with ``build()`` only when needed.
+
+    A snapshot is served as is until an entry, exit or revenue event in its
+    scope bumps the scope's version, and expires after KPI_SNAPSHOT_TTL
+    seconds regardless. A stale snapshot is still served while it is younger
+    than KPI_SNAPSHOT_MIN_INTERVAL seconds or while another request is
+    rebuilding it, so a busy lot costs at most one rebuild per interval no
+    matter how many dashboards poll it.
+    """
+    version = cache.get_or_set(KPI_VERSION_KEY.format(scope), uuid.uuid4().hex, timeout=None)
+    snapshot = cache.get(KPI_SNAPSHOT_KEY.format(scope))
+    lock_key = KPI_REBUILD_LOCK_KEY.format(scope)
+    if snapshot is not None and snapshot['version'] != version:
+        if time.time() - snapshot['built_at'] < settings.KPI_SNAPSHOT_MIN_INTERVAL:
+            return snapshot['data']
+        if not cache.add(lock_key, 1, timeout=settings.KPI_SNAPSHOT_TTL):
+            return snapshot['data']
+    elif snapshot is not None:
+        return snapshot['data']
+
+    try:
+        data = build()
+        cache.set(
+            KPI_SNAPSHOT_KEY.format(scope),
+            {'version': version, 'built_at': time.time(), 'data': data},
+            timeout=settings.KPI_SNAPSHOT_TTL,
+        )
+    finally:
+        cache.delete(lock_key)
+    return data
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from parking_transactions.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily revenue rollup from completed parking sessions. Run off-peak."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Only rebuild local days from this date on (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+
+        written = rebuild(since)
+        self.stdout.write(f"Wrote {written} daily revenue rollup row(s)")
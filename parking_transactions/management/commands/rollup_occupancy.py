@@ -0,0 +1,39 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from parking_transactions.occupancy_history import local_midnight, rebuild
+
+
+class Command(BaseCommand):
+    help = "Compute hourly occupancy, utilization and turnover per lot from parking sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Recompute from this local date on (YYYY-MM-DD); default: the last --hours")
+        parser.add_argument('--hours', type=int, default=48,
+                            help="Hours to recompute on each pass when --since is not given (default 48)")
+        parser.add_argument('--lot', type=int, action='append', help="Only this lot (may be repeated)")
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Keep running, recomputing every this many seconds (default: once)")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError("--since must be a date in YYYY-MM-DD format")
+
+        while True:
+            started = time.monotonic()
+            start = local_midnight(since) if since else timezone.now() - timedelta(hours=options['hours'])
+            written = rebuild(start, parking_lot_ids=options['lot'])
+            self.stdout.write(f"Wrote {written} hourly occupancy row(s) in {time.monotonic() - started:.2f}s")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
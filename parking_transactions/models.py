@@ -1,8 +1,15 @@
+from django.conf import settings
 from django.db import models
 from cars.models import Car
 from parking_lots.models import ParkingSpace
 
 class ParkingTransaction(models.Model):
+    PAYMENT_STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PAID', 'Paid'),
+        ('FAILED', 'Failed'),
+    ]
+
     car = models.ForeignKey(Car, on_delete=models.SET_NULL, null=True)
     parking_space = models.ForeignKey(ParkingSpace, on_delete=models.SET_NULL, null=True)
     entry_time = models.DateTimeField()
@@ -12,7 +19,102 @@ class ParkingTransaction(models.Model):
     cyyks_share = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     client_share = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     status = models.CharField(max_length=20, default='ongoing')
+    payment_status = models.CharField(max_length=20, choices=PAYMENT_STATUS_CHOICES, default='PENDING')
+    mpesa_transaction_id = models.CharField(max_length=50, null=True, blank=True)
+    entry_event_id = models.CharField(max_length=64, null=True, blank=True, unique=True)  # ingestion event that opened the session
+    exit_event_id = models.CharField(max_length=64, null=True, blank=True, unique=True)  # ingestion event that closed it
+    settlement = models.ForeignKey(
+        'payments.Settlement', on_delete=models.SET_NULL, null=True, blank=True, related_name='parking_transactions'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Open sessions are a small, hot slice of an ever-growing table;
+            # exit-by-plate lookups only touch this partial index
+            models.Index(fields=['car'], condition=models.Q(status='ongoing'), name='ongoing_session_car_idx'),
+            # Session intervals per space and time, read by the hourly occupancy sweep
+            models.Index(fields=['parking_space', 'entry_time'], name='space_entry_time_idx'),
+            # Completed sessions still waiting for payment, swept by `manage.py reconcile_payments`
+            models.Index(
+                fields=['id'], condition=models.Q(payment_status='PENDING', status='completed'),
+                name='pending_payment_idx'
+            ),
+            # Paid sessions not settled yet, picked up by `manage.py settle_payments`
+            models.Index(
+                fields=['exit_time'], condition=models.Q(payment_status='PAID', status='completed', settlement__isnull=True),
+                name='unsettled_payment_idx'
+            ),
+        ]
+
+    def calculate_fee(self, exit_time=None):
+        """Fee for this session under its lot's tariff, as of exit_time (defaults to the recorded exit)."""
+        from parking_transactions.tariffs import tariffs
+
+        parking_lot_id = self.parking_space.parking_lot_id if self.parking_space else None
+        return tariffs.get(parking_lot_id).fee(self.entry_time, exit_time or self.exit_time)
+
+    def __str__(self):
+        return f"{self.car.number_plate} - {self.status}"
+
+class DailyRevenueRollup(models.Model):
+    """
+    Completed sessions and their fees per lot, client and local business day
+    (settings.LOCAL_TIME_ZONE). Kept current by parking_transactions.rollups
+    as sessions complete; `manage.py backfill_revenue_rollup` rebuilds it.
+    """
+    parking_lot = models.ForeignKey('parking_lots.ParkingLot', on_delete=models.CASCADE, related_name='daily_revenue')
+    client = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_revenue'
+    )
+    date = models.DateField()
+    sessions = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['parking_lot', 'client', 'date'], condition=models.Q(client__isnull=False),
+                name='unique_daily_revenue'
+            ),
+            models.UniqueConstraint(
+                fields=['parking_lot', 'date'], condition=models.Q(client__isnull=True),
+                name='unique_daily_revenue_no_client'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['client', 'date']),
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.parking_lot.name} {self.date}: {self.revenue}"
+
+class HourlyOccupancy(models.Model):
+    """
+    Occupancy of a lot over one clock hour (``hour`` is its start), computed
+    from session intervals by `manage.py rollup_occupancy`.
+
+    average_occupancy is occupied space-hours within the hour, utilization
+    is that as a percentage of ``spaces`` and turnover is entries per space.
+    """
+    parking_lot = models.ForeignKey('parking_lots.ParkingLot', on_delete=models.CASCADE, related_name='hourly_occupancy')
+    hour = models.DateTimeField()
+    spaces = models.PositiveIntegerField(default=0)
+    average_occupancy = models.FloatField(default=0)
+    peak_occupancy = models.PositiveIntegerField(default=0)
+    utilization = models.FloatField(default=0)
+    entries = models.PositiveIntegerField(default=0)
+    exits = models.PositiveIntegerField(default=0)
+    turnover = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['parking_lot', 'hour'], name='unique_hourly_occupancy'),
+        ]
+        indexes = [
+            models.Index(fields=['hour']),
+        ]
+
     def __str__(self):
-        return f"{self.car.number_plate} - {self.status}"
\ No newline at end of file
+        return f"{self.parking_lot.name} {self.hour}: {self.utilization:.1f}%"
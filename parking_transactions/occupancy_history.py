@@ -0,0 +1,124 @@
+from datetime import datetime, time as clock_time, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from parking_transactions.models import HourlyOccupancy, ParkingTransaction
+
+HOUR = 3600
+
+
+def local_midnight(day):
+    return datetime.combine(day, clock_time(), tzinfo=ZoneInfo(settings.LOCAL_TIME_ZONE))
+
+
+def hour_floor(moment):
+    return moment.astimezone(ZoneInfo(settings.LOCAL_TIME_ZONE)).replace(minute=0, second=0, microsecond=0)
+
+
+def sweep(entry_seconds, exit_seconds, start, hours, until=None):
+    """Hourly occupancy statistics from session intervals, as arrays of length ``hours``.
+
+    Times are epoch seconds and ``start`` is the start of the first hour.
+    Open sessions have a NaN exit and count as parked until ``until``. Every
+    entry and exit becomes a +1/-1 event; together with a 0 event at each
+    hour boundary they are sorted once and cumulatively summed, giving the
+    occupancy level between consecutive events, so the time-weighted
+    average and the peak of every hour fall out of a bincount and a
+    reduceat with no per-session Python work.
+    """
+    entry_seconds = np.asarray(entry_seconds, dtype=np.float64)
+    exit_seconds = np.asarray(exit_seconds, dtype=np.float64)
+    end = start + hours * HOUR
+    is_open = np.isnan(exit_seconds)
+    parked_until = np.where(is_open, until if until is not None else end, exit_seconds)
+
+    clipped_entry = np.clip(entry_seconds, start, end)
+    clipped_exit = np.clip(parked_until, start, end)
+    overlaps = clipped_exit > clipped_entry
+    edges = start + HOUR * np.arange(hours, dtype=np.float64)
+    times = np.concatenate([clipped_exit[overlaps], edges, clipped_entry[overlaps]])
+    deltas = np.concatenate([
+        -np.ones(overlaps.sum(), dtype=np.int64), np.zeros(hours, dtype=np.int64), np.ones(overlaps.sum(), dtype=np.int64)
+    ])
+    # At equal times exits apply before the boundary and entries after it
+    order = np.lexsort((deltas, times))
+    times = times[order]
+    level = np.cumsum(deltas[order])
+    durations = np.diff(times, append=end)
+    bucket = np.minimum(((times - start) // HOUR).astype(np.int64), hours - 1)
+
+    occupied_seconds = np.bincount(bucket, weights=level * durations, minlength=hours)
+    # Only the level after the last of several simultaneous events really occurs; an exit on
+    # an hour boundary would otherwise briefly count in the next hour. Each hour starts with
+    # its boundary event, so every bucket still holds at least one real level.
+    settled = np.where(durations > 0, level, 0)
+    peak = np.maximum.reduceat(settled, np.searchsorted(bucket, np.arange(hours)))
+
+    def per_hour(seconds):
+        seconds = seconds[(seconds >= start) & (seconds < end)]
+        return np.bincount(((seconds - start) // HOUR).astype(np.int64), minlength=hours)
+
+    return {
+        'average_occupancy': occupied_seconds / HOUR,
+        'peak_occupancy': peak,
+        'entries': per_hour(entry_seconds),
+        'exits': per_hour(exit_seconds[~is_open]),
+    }
+
+
+def compute_lot(parking_lot, start, end, now=None):
+    """Recompute and store a lot's hourly rows for [start, end); returns rows written.
+
+    ``start`` is rounded down to a local hour and ``end`` is capped at the
+    end of the current hour. Utilization uses the lot's current space count.
+    """
+    now = now or timezone.now()
+    start = hour_floor(start)
+    end = min(end, hour_floor(now) + timedelta(hours=1))
+    hours = int((end - start).total_seconds() // HOUR)
+    if hours <= 0:
+        return 0
+
+    sessions = ParkingTransaction.objects.filter(
+        parking_space__parking_lot_id=parking_lot.id, entry_time__lt=end
+    ).filter(Q(exit_time__gte=start) | Q(exit_time__isnull=True)).values_list('entry_time', 'exit_time')
+    intervals = np.array(
+        [(entry_time.timestamp(), exit_time.timestamp() if exit_time else np.nan) for entry_time, exit_time in sessions],
+        dtype=np.float64,
+    ).reshape(-1, 2)
+    stats = sweep(intervals[:, 0], intervals[:, 1], start.timestamp(), hours, until=now.timestamp())
+
+    spaces = parking_lot.space_count
+    utilization = stats['average_occupancy'] / spaces * 100 if spaces else np.zeros(hours)
+    turnover = stats['entries'] / spaces if spaces else np.zeros(hours)
+    rows = [
+        HourlyOccupancy(
+            parking_lot=parking_lot, hour=start + timedelta(hours=index), spaces=spaces,
+            average_occupancy=round(float(average), 3), peak_occupancy=int(peak),
+            utilization=round(float(percent), 2), entries=int(entries), exits=int(exits),
+            turnover=round(float(rate), 3),
+        ) for index, (average, peak, percent, entries, exits, rate) in enumerate(zip(
+            stats['average_occupancy'], stats['peak_occupancy'], utilization,
+            stats['entries'], stats['exits'], turnover,
+        ))
+    ]
+    with transaction.atomic():
+        HourlyOccupancy.objects.filter(parking_lot=parking_lot, hour__gte=start, hour__lt=end).delete()
+        HourlyOccupancy.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def rebuild(start, end=None, parking_lot_ids=None):
+    """Recompute hourly occupancy for every lot (or the given ones) between two datetimes."""
+    from parking_lots.models import ParkingLot
+
+    end = end or timezone.now()
+    lots = ParkingLot.objects.all()
+    if parking_lot_ids:
+        lots = lots.filter(id__in=parking_lot_ids)
+    return sum(compute_lot(lot, start, end) for lot in lots)
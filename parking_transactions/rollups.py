@@ -0,0 +1,126 @@
+from datetime import timedelta
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from parking_transactions.kpis import invalidate_kpis
+from parking_transactions.models import DailyRevenueRollup, ParkingTransaction
+
+GRANULARITIES = {'day': None, 'week': TruncWeek, 'month': TruncMonth}
+# Longest range served per granularity, in days, so a report never has more than a few hundred periods
+MAX_REPORT_DAYS = {'day': 366, 'week': 366 * 5, 'month': 366 * 20}
+
+
+def local_date(moment):
+    return moment.astimezone(ZoneInfo(settings.LOCAL_TIME_ZONE)).date()
+
+
+def record_revenue(parking_lot_id, client_id, exit_time, fee):
+    """Add one completed session to its lot's rollup for the day; call in the completing transaction."""
+    day = local_date(exit_time)
+    fee = fee or Decimal('0.00')
+    invalidate_kpis(parking_lot_id, client_id)
+    rows = DailyRevenueRollup.objects.filter(parking_lot_id=parking_lot_id, client_id=client_id, date=day)
+    if rows.update(sessions=F('sessions') + 1, revenue=F('revenue') + fee):
+        return
+    try:
+        with transaction.atomic():
+            DailyRevenueRollup.objects.create(
+                parking_lot_id=parking_lot_id, client_id=client_id, date=day, sessions=1, revenue=fee
+            )
+    except IntegrityError:
+        # Another session created the row first
+        rows.update(sessions=F('sessions') + 1, revenue=F('revenue') + fee)
+
+
+def record_session_revenue(parking_txn):
+    parking_space = parking_txn.parking_space
+    if parking_space is None or parking_txn.exit_time is None:
+        return
+    record_revenue(parking_space.parking_lot_id, parking_space.parking_lot.client_id, parking_txn.exit_time, parking_txn.fee)
+
+
+def rebuild(since=None):
+    """Recompute the rollup from completed sessions (from local date ``since`` on); returns rows written."""
+    sessions = ParkingTransaction.objects.filter(status='completed', exit_time__isnull=False, parking_space__isnull=False)
+    rollups = DailyRevenueRollup.objects.all()
+    if since:
+        sessions = sessions.annotate(
+            local_date=TruncDate('exit_time', tzinfo=ZoneInfo(settings.LOCAL_TIME_ZONE))
+        ).filter(local_date__gte=since)
+        rollups = rollups.filter(date__gte=since)
+
+    rows = sessions.values(
+        parking_lot_id=F('parking_space__parking_lot_id'),
+        client_id=F('parking_space__parking_lot__client_id'),
+        day=TruncDate('exit_time', tzinfo=ZoneInfo(settings.LOCAL_TIME_ZONE)),
+    ).annotate(count=Count('id'), total=Sum('fee')).order_by()
+
+    with transaction.atomic():
+        rollups.delete()
+        created = DailyRevenueRollup.objects.bulk_create([
+            DailyRevenueRollup(
+                parking_lot_id=row['parking_lot_id'], client_id=row['client_id'], date=row['day'],
+                sessions=row['count'], revenue=(row['total'] or Decimal('0.00')).quantize(Decimal('0.01')),
+            ) for row in rows
+        ])
+    return len(created)
+
+
+def parse_report_range(params, default_days=30):
+    """(start, end, granularity) from ?start=YYYY-MM-DD&end=YYYY-MM-DD&granularity=day|week|month."""
+    granularity = params.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        raise ValueError("granularity must be one of day, week, month")
+    end = parse_date(params['end']) if params.get('end') else local_date(timezone.now())
+    start = parse_date(params['start']) if params.get('start') else end - timedelta(days=default_days - 1)
+    if start is None or end is None:
+        raise ValueError("start and end must be dates in YYYY-MM-DD format")
+    if start > end:
+        raise ValueError("start must not be after end")
+    if (end - start).days + 1 > MAX_REPORT_DAYS[granularity]:
+        raise ValueError(f"Ranges at {granularity} granularity may span at most {MAX_REPORT_DAYS[granularity]} days")
+    return start, end, granularity
+
+
+def period_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def revenue_series(rollups, start, end, granularity='day'):
+    """Revenue and sessions per period between two local dates, newest first, from one range query.
+
+    ``rollups`` is a DailyRevenueRollup queryset (e.g. filtered to a client);
+    periods without traffic are reported with zero revenue.
+    """
+    rows = rollups.filter(date__range=(start, end))
+    if GRANULARITIES[granularity] is not None:
+        rows = rows.annotate(period=GRANULARITIES[granularity]('date'))
+    else:
+        rows = rows.annotate(period=F('date'))
+    totals = {
+        (row['period'].date() if hasattr(row['period'], 'date') else row['period']): row
+        for row in rows.values('period').annotate(revenue_total=Sum('revenue'), session_total=Sum('sessions')).order_by()
+    }
+
+    series = []
+    period = period_start(end, granularity)
+    while period >= period_start(start, granularity):
+        row = totals.get(period, {})
+        series.append({
+            'date': period,
+            'revenue': row.get('revenue_total') or 0,
+            'sessions': row.get('session_total') or 0,
+        })
+        period = period_start(period - timedelta(days=1), granularity)
+    return series
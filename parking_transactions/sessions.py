@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.utils import timezone
+
+from cars.plates import plate_index
+from parking_transactions.models import ParkingTransaction
+
+
+def find_open_session(number_plate, parking_lot_id, user=None):
+    """The ongoing session in a lot for a (possibly misread) plate.
+
+    Candidate cars come from the in-memory plate index and the session from
+    the partial index on ongoing sessions, so the lookup never scans
+    history. The session row is locked, so call inside transaction.atomic();
+    a concurrent exit for the same car then finds it closed. Restricted to
+    ``user``'s cars when given. Raises
+    ParkingTransaction.DoesNotExist when no session, or more than one
+    candidate session, matches.
+    """
+    sessions = ParkingTransaction.objects.select_related('car__user', 'parking_space__parking_lot').select_for_update(
+        of=('self',)
+    ).filter(
+        status='ongoing',
+        car_id__in=plate_index.candidates(number_plate),
+        parking_space__parking_lot_id=parking_lot_id,
+    )
+    if user is not None:
+        sessions = sessions.filter(car__user=user)
+    sessions = list(sessions[:2])
+    if len(sessions) != 1:
+        raise ParkingTransaction.DoesNotExist(
+            f"{'Ambiguous' if sessions else 'No'} ongoing session for {number_plate} in lot {parking_lot_id}"
+        )
+    return sessions[0]
+
+
+def close_session(parking_txn, exit_time=None, exit_event_id=None):
+    """Complete a session, free its space and queue its payment; call inside transaction.atomic().
+
+    Returns the queued PaymentOutbox row.
+    """
+    from parking_lots.occupancy import vacate
+    from parking_transactions.rollups import record_session_revenue
+    from payments.outbox import enqueue_payment
+
+    parking_txn.exit_time = exit_time or timezone.now()
+    parking_txn.duration = parking_txn.exit_time - parking_txn.entry_time
+    parking_txn.fee = parking_txn.calculate_fee()
+    parking_txn.status = 'completed'
+    parking_txn.payment_status = 'PENDING'
+    parking_txn.exit_event_id = exit_event_id
+    parking_space = parking_txn.parking_space
+    if parking_space is not None and parking_space.is_occupied:
+        parking_space.is_occupied = False
+        parking_space.save()
+        vacate(parking_space.parking_lot_id)
+    parking_txn.save()
+    record_session_revenue(parking_txn)
+
+    # Normalize phone number for payment payload
+    stored_phone = parking_txn.car.user.phone_number
+    if stored_phone.startswith('0'):
+        normalized_phone = '254' + stored_phone[1:]
+    else:
+        normalized_phone = stored_phone
+
+    # The dispatch_payments worker sends it once this transaction commits
+    payment_payload = {
+        "order_id": f"park-{parking_txn.id}",
+        "user_id": str(parking_txn.car.user.id),
+        "amount": f"{parking_txn.fee:.2f}",
+        "client_till_number": settings.CLIENT_TILL_NUMBER,
+        "phone_number": normalized_phone
+    }
+    return enqueue_payment(payment_payload["order_id"], payment_payload, parking_txn)
@@ -0,0 +1,154 @@
+import threading
+import uuid
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+TARIFF_VERSION_KEY = 'parking_transactions:tariff-version'
+
+
+def to_cents(amount):
+    return int((Decimal(str(amount)) * 100).to_integral_value())
+
+
+def from_cents(cents):
+    return (Decimal(int(cents)) / 100).quantize(Decimal('0.01'))
+
+
+class CompiledTariff:
+    """A lot's rate table compiled into integer-cent lookup tables.
+
+    ``cumulative[s, k]`` is the (daily-capped) charge for the first ``k``
+    started hours of a 24 hour block that begins at local clock hour ``s``,
+    so the fee of any session is ``days * cumulative[s, 24] +
+    cumulative[s, hours % 24]``: O(1) per session and a couple of array
+    lookups for a whole batch.
+    """
+
+    def __init__(self, grace_minutes=0, hourly_bands=None, daily_cap=None, night_rate=None,
+                 night_start=None, night_end=None):
+        self.grace_seconds = grace_minutes * 60
+        self.time_zone = ZoneInfo(settings.LOCAL_TIME_ZONE)
+
+        band_rates = np.zeros(24, dtype=np.int64)
+        hour = 0
+        for up_to, rate in hourly_bands or []:
+            end = 24 if up_to is None else min(int(up_to), 24)
+            band_rates[hour:end] = to_cents(rate)
+            hour = max(hour, end)
+        if hourly_bands and hour < 24:
+            band_rates[hour:] = to_cents(hourly_bands[-1][1])
+
+        # rates[s, i]: charge for the i-th hour of a block starting at clock hour s
+        clock_hours = (np.arange(24)[:, None] + np.arange(24)[None, :]) % 24
+        rates = np.broadcast_to(band_rates, (24, 24)).copy()
+        if night_rate is not None and night_start is not None and night_end is not None:
+            start, end = night_start.hour, night_end.hour
+            if start <= end:
+                is_night = (clock_hours >= start) & (clock_hours < end)
+            else:
+                is_night = (clock_hours >= start) | (clock_hours < end)
+            rates[is_night] = to_cents(night_rate)
+
+        cumulative = np.zeros((24, 25), dtype=np.int64)
+        cumulative[:, 1:] = np.cumsum(rates, axis=1)
+        if daily_cap is not None:
+            cumulative = np.minimum(cumulative, to_cents(daily_cap))
+        self.cumulative = cumulative
+
+    @classmethod
+    def from_model(cls, tariff):
+        return cls(
+            grace_minutes=tariff.grace_minutes,
+            hourly_bands=tariff.hourly_bands,
+            daily_cap=tariff.daily_cap,
+            night_rate=tariff.night_rate,
+            night_start=tariff.night_start,
+            night_end=tariff.night_end,
+        )
+
+    def fees_cents(self, duration_seconds, entry_hours):
+        """Vectorised fees in cents for session durations and the local clock hour each one started in."""
+        duration_seconds = np.asarray(duration_seconds, dtype=np.float64)
+        entry_hours = np.asarray(entry_hours, dtype=np.int64)
+        hours = np.ceil(np.maximum(duration_seconds, 0) / 3600).astype(np.int64)
+        days, remainder = np.divmod(hours, 24)
+        fees = days * self.cumulative[entry_hours, 24] + self.cumulative[entry_hours, remainder]
+        fees[duration_seconds <= self.grace_seconds] = 0
+        return fees
+
+    def fees(self, entry_times, exit_times):
+        """Fees (Decimal) for parallel sequences of aware entry and exit datetimes."""
+        durations = [(exit_time - entry_time).total_seconds() for entry_time, exit_time in zip(entry_times, exit_times)]
+        entry_hours = [entry_time.astimezone(self.time_zone).hour for entry_time in entry_times]
+        cents = self.fees_cents(durations, entry_hours)
+        return [from_cents(value) for value in cents]
+
+    def fee(self, entry_time, exit_time):
+        return self.fees([entry_time], [exit_time])[0]
+
+
+class TariffCache:
+    """Per-process map of lot id to compiled tariff.
+
+    All tariffs are loaded in one query the first time one is needed and
+    again only after a Tariff is saved or deleted somewhere (tracked through
+    a version key in the shared cache), so pricing an exit never hits the
+    database.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.tariffs = {}
+        self.default = None
+
+    def _load(self):
+        from parking_lots.models import Tariff
+
+        self.tariffs = {tariff.parking_lot_id: CompiledTariff.from_model(tariff) for tariff in Tariff.objects.all()}
+        self.default = CompiledTariff(**settings.DEFAULT_TARIFF)
+
+    def get(self, parking_lot_id):
+        version = cache.get_or_set(TARIFF_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self._load()
+                    self.version = version
+        return self.tariffs.get(parking_lot_id, self.default)
+
+
+def invalidate_tariffs():
+    cache.set(TARIFF_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+tariffs = TariffCache()
+
+
+def evaluate_fees(sessions, until=None):
+    """Price many sessions at once.
+
+    ``sessions`` is an iterable of (id, parking_lot_id, entry_time, exit_time)
+    tuples, e.g. straight from ``values_list``; open sessions (exit_time None)
+    are priced as of ``until``. Returns {id: Decimal fee}. Sessions are
+    grouped per lot and each group is priced with one vectorised lookup.
+    """
+    until = until or timezone.now()
+    time_zone = ZoneInfo(settings.LOCAL_TIME_ZONE)
+    by_lot = {}
+    for session_id, parking_lot_id, entry_time, exit_time in sessions:
+        by_lot.setdefault(parking_lot_id, []).append((session_id, entry_time, exit_time or until))
+
+    fees = {}
+    for parking_lot_id, rows in by_lot.items():
+        ids = [row[0] for row in rows]
+        durations = np.array([row[2].timestamp() for row in rows]) - np.array([row[1].timestamp() for row in rows])
+        entry_hours = [row[1].astimezone(time_zone).hour for row in rows]
+        cents = tariffs.get(parking_lot_id).fees_cents(durations, entry_hours)
+        fees.update({session_id: from_cents(value) for session_id, value in zip(ids, cents)})
+    return fees
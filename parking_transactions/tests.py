@@ -1,3 +1,183 @@
-from django.test import TestCase
+import math
+from datetime import datetime, time
+from decimal import Decimal
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from parking_transactions.dwell import DWELL_BIN_LABELS, DWELL_BINS, summarize
+from parking_transactions.occupancy_history import HOUR, sweep
+from parking_transactions.tariffs import CompiledTariff, to_cents
+
+
+def reference_fee_cents(duration_seconds, entry_hour, grace_minutes=0, hourly_bands=None, daily_cap=None,
+                        night_rate=None, night_start=None, night_end=None):
+    """Charge a session hour by hour, the way the Tariff model describes it."""
+    if duration_seconds <= grace_minutes * 60:
+        return 0
+    hours = math.ceil(duration_seconds / 3600)
+    total = 0
+    for block_start in range(0, hours, 24):
+        block = 0
+        for hour in range(block_start, min(hours, block_start + 24)):
+            offset = hour - block_start
+            rate = 0
+            for up_to, band_rate in hourly_bands or []:
+                rate = band_rate
+                if up_to is None or offset < up_to:
+                    break
+            clock_hour = (entry_hour + hour) % 24
+            if night_rate is not None and night_start is not None and night_end is not None:
+                start, end = night_start.hour, night_end.hour
+                if (start <= clock_hour < end) if start <= end else (clock_hour >= start or clock_hour < end):
+                    rate = night_rate
+            block += to_cents(rate)
+        total += block if daily_cap is None else min(block, to_cents(daily_cap))
+    return total
+
+
+class CompiledTariffTests(SimpleTestCase):
+    TARIFFS = [
+        {'grace_minutes': 10, 'hourly_bands': [[None, '100.00']], 'daily_cap': '1000.00'},
+        {'grace_minutes': 0, 'hourly_bands': [[2, '50.00'], [5, '80.00'], [None, '120.00']]},
+        {
+            'grace_minutes': 15, 'hourly_bands': [[3, '60.00'], [None, '90.00']], 'daily_cap': '900.00',
+            'night_rate': '20.00', 'night_start': time(22), 'night_end': time(6),
+        },
+        {
+            'grace_minutes': 5, 'hourly_bands': [[1, '30.00'], [8, '70.00']],
+            'night_rate': '10.00', 'night_start': time(1), 'night_end': time(4),
+        },
+    ]
+    DURATIONS = [
+        0, 1, 299, 300, 301, 599, 600, 601, 900, 901, 3599, 3600, 3601, 7200, 7201, 5 * 3600 + 1,
+        23 * 3600, 24 * 3600 - 1, 24 * 3600, 24 * 3600 + 1, 25 * 3600, 47 * 3600 + 1800, 48 * 3600,
+        73 * 3600 + 1, 7 * 24 * 3600 + 5 * 3600,
+    ]
+
+    def test_fees_match_hourly_reference(self):
+        durations = np.array([duration for duration in self.DURATIONS for _ in range(24)], dtype=np.float64)
+        entry_hours = np.array([hour for _ in self.DURATIONS for hour in range(24)])
+        for options in self.TARIFFS:
+            with self.subTest(tariff=options):
+                fees = CompiledTariff(**options).fees_cents(durations, entry_hours)
+                expected = [
+                    reference_fee_cents(duration, hour, **options) for duration, hour in zip(durations, entry_hours)
+                ]
+                self.assertEqual(fees.tolist(), expected)
+
+    def test_grace_period_is_free(self):
+        tariff = CompiledTariff(grace_minutes=10, hourly_bands=[[None, '100.00']])
+        self.assertEqual(tariff.fees_cents([600, 601], [8, 8]).tolist(), [0, 10000])
+
+    def test_multi_day_sessions_pay_the_cap_per_day(self):
+        tariff = CompiledTariff(hourly_bands=[[None, '100.00']], daily_cap='1000.00')
+        self.assertEqual(tariff.fees_cents([3 * 24 * 3600, 3 * 24 * 3600 + 1], [0, 0]).tolist(), [300000, 310000])
+
+    def test_night_rate_follows_local_clock_across_midnight(self):
+        tariff = CompiledTariff(
+            hourly_bands=[[None, '100.00']], night_rate='20.00', night_start=time(22), night_end=time(6)
+        )
+        local = ZoneInfo(settings.LOCAL_TIME_ZONE)
+        entry_time = datetime(2026, 3, 1, 21, 30, tzinfo=local)
+        # Hours starting 21:30, 22:30, 23:30 and 00:30 local: one day hour, then three night hours
+        self.assertEqual(tariff.fee(entry_time, datetime(2026, 3, 2, 1, 0, tzinfo=local)), Decimal('160.00'))
+        self.assertEqual(
+            tariff.fee(entry_time.astimezone(ZoneInfo('UTC')), datetime(2026, 3, 2, 1, 0, tzinfo=local)),
+            Decimal('160.00'),
+        )
+
+
+def reference_sweep(entries, exits, start, hours, until):
+    """Per-hour average and peak occupancy by integrating each hour separately."""
+    parked_until = [until if math.isnan(exit_time) else exit_time for exit_time in exits]
+    average, peak = [], []
+    for hour in range(hours):
+        hour_start, hour_end = start + hour * HOUR, start + (hour + 1) * HOUR
+        average.append(sum(
+            max(0.0, min(exit_time, hour_end) - max(entry_time, hour_start))
+            for entry_time, exit_time in zip(entries, parked_until)
+        ) / HOUR)
+        # Occupancy only rises at an entry, so its maximum is reached at the hour start or at an entry
+        moments = [hour_start] + [entry_time for entry_time in entries if hour_start <= entry_time < hour_end]
+        peak.append(max(
+            sum(1 for entry_time, exit_time in zip(entries, parked_until) if entry_time <= moment < exit_time)
+            for moment in moments
+        ))
+    return average, peak
+
+
+class OccupancySweepTests(SimpleTestCase):
+    def test_small_example(self):
+        stats = sweep([0, 1800, 9000], [5400, 3600, np.nan], 0, 3, until=9900)
+        np.testing.assert_allclose(stats['average_occupancy'], [1.5, 0.5, 0.25])
+        self.assertEqual(stats['peak_occupancy'].tolist(), [2, 1, 1])
+        self.assertEqual(stats['entries'].tolist(), [2, 0, 1])
+        self.assertEqual(stats['exits'].tolist(), [0, 2, 0])
+
+    def test_matches_reference(self):
+        rng = np.random.default_rng(7)
+        start, hours = 1_700_000_000 - 1_700_000_000 % HOUR, 48
+        entries = rng.integers(start - 6 * HOUR, start + hours * HOUR, 400).astype(np.float64)
+        exits = entries + rng.integers(0, 10 * HOUR, 400)
+        # Sessions on hour boundaries, back-to-back on one space, zero-length and still open
+        entries[:40] = entries[:40] - entries[:40] % HOUR
+        exits[:40] = exits[:40] - exits[:40] % HOUR
+        entries[40:60] = exits[:20]
+        exits[60:70] = entries[60:70]
+        exits[70:90] = np.nan
+        until = start + (hours - 1) * HOUR + 1234
+
+        stats = sweep(entries, exits, start, hours, until=until)
+        average, peak = reference_sweep(entries, exits, start, hours, until)
+        np.testing.assert_allclose(stats['average_occupancy'], average)
+        self.assertEqual(stats['peak_occupancy'].tolist(), peak)
+
+        def per_hour(times):
+            return [sum(1 for moment in times if start + hour * HOUR <= moment < start + (hour + 1) * HOUR)
+                    for hour in range(hours)]
+
+        self.assertEqual(stats['entries'].tolist(), per_hour(entries))
+        self.assertEqual(stats['exits'].tolist(), per_hour(exits[~np.isnan(exits)]))
+
+    def test_no_sessions(self):
+        stats = sweep([], [], 0, 4)
+        self.assertEqual(stats['average_occupancy'].tolist(), [0.0] * 4)
+        self.assertEqual(stats['peak_occupancy'].tolist(), [0] * 4)
+
+
+class DwellSummaryTests(SimpleTestCase):
+    def test_matches_numpy_per_group(self):
+        rng = np.random.default_rng(11)
+        minutes = np.concatenate([rng.exponential(90, 500), [0, 15, 1440, 3000]])
+        keys = rng.integers(1, 6, len(minutes))
+        keys[-4:] = 9
+        summary = summarize(minutes, keys)
+
+        self.assertEqual(sorted(summary), sorted(set(keys.tolist())))
+        for key, stats in summary.items():
+            group = minutes[keys == key]
+            with self.subTest(key=key):
+                self.assertEqual(stats['sessions'], len(group))
+                self.assertAlmostEqual(stats['mean_minutes'], group.mean(), delta=0.05 + 1e-9)
+                for name, quantile in (('p50_minutes', 50), ('p90_minutes', 90), ('p99_minutes', 99)):
+                    self.assertAlmostEqual(stats[name], np.percentile(group, quantile), delta=0.05 + 1e-9)
+                edges = list(DWELL_BINS) + [math.inf]
+                self.assertEqual(stats['histogram'], [
+                    int(((group >= low) & (group < high)).sum()) for low, high in zip(edges, edges[1:])
+                ])
+
+    def test_bin_edges_are_closed_on_the_left(self):
+        stats = summarize(np.array([0.0, 14.9, 15.0, 1440.0]), np.zeros(4, dtype=np.int64))[0]
+        self.assertEqual(len(stats['histogram']), len(DWELL_BIN_LABELS))
+        self.assertEqual(stats['histogram'][:2], [2, 1])
+        self.assertEqual(stats['histogram'][-1], 1)
+
+    def test_single_session(self):
+        stats = summarize(np.array([42.0]), np.array([3]))[3]
+        self.assertEqual((stats['p50_minutes'], stats['p99_minutes'], stats['mean_minutes']), (42.0, 42.0, 42.0))
+
+    def test_empty(self):
+        self.assertEqual(summarize(np.array([]), np.array([], dtype=np.int64)), {})
@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from payments.models import CentralTill, ClientTill, PaymentCallback, PaymentOutbox, Settlement, SettlementLine
+
+# Register your models here.
+admin.site.register(PaymentOutbox)
+admin.site.register(PaymentCallback)
+admin.site.register(CentralTill)
+admin.site.register(ClientTill)
+admin.site.register(Settlement)
+admin.site.register(SettlementLine)
@@ -0,0 +1,169 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = 'payments:client:'
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Statuses that mean the provider did not act on the request, so it is safe to send again
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling the payments service while the circuit breaker is open."""
+
+
+class PaymentsClient:
+    """Shared, per-process client for the payments service.
+
+    One keep-alive ``requests.Session`` is reused for every call, so a
+    payment does not pay for a fresh TCP and TLS handshake. Requests the
+    provider cannot have acted on (connection failures, 429/502/503/504) are
+    retried with full-jitter backoff; read timeouts are not, since the
+    payment may already be under way. After ``failure_threshold``
+    consecutive failures the circuit opens and calls fail fast with
+    CircuitOpenError for ``reset_timeout`` seconds, then a single trial
+    request decides whether it closes again. Request counts, errors and a
+    latency histogram are kept in the shared cache (see ``metrics``).
+    """
+
+    def __init__(self, base_url, timeout=10, retries=2, backoff=0.5, failure_threshold=5, reset_timeout=30,
+                 pool_size=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.session = requests.Session()
+        self.session.headers['Content-Type'] = 'application/json'
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def available(self):
+        """False while the circuit is open and calls would be rejected."""
+        with self.lock:
+            return self.opened_at is None or time.monotonic() - self.opened_at >= self.reset_timeout
+
+    def _admit(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_in_flight:
+                return False
+            self.trial_in_flight = True  # half-open: let one request through
+            return True
+
+    def _record(self, ok):
+        with self.lock:
+            self.trial_in_flight = False
+            if ok:
+                if self.opened_at is not None:
+                    logger.info("Payments service recovered, closing circuit")
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Payments service failing ({self.failures} in a row), opening circuit for {self.reset_timeout}s")
+                self.opened_at = time.monotonic()
+
+    def post(self, path, payload, idempotency_key=None):
+        """POST ``payload`` as JSON to ``path``; returns the response or raises a RequestException.
+
+        ``idempotency_key`` is sent as the Idempotency-Key header so the
+        provider can drop a request it has already acted on.
+        """
+        if not self._admit():
+            count('rejected')
+            raise CircuitOpenError("Payments service circuit is open")
+
+        url = f"{self.base_url}{path}"
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                count('retries')
+                time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+            started = time.monotonic()
+            try:
+                response = self.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                observe((time.monotonic() - started) * 1000, error=True)
+                retryable = isinstance(e, requests.exceptions.ConnectionError) and attempt < self.retries
+                if not retryable:
+                    self._record(False)
+                    raise
+                logger.warning(f"Payments request to {path} failed, retrying: {str(e)}")
+                continue
+
+            failed = response.status_code >= 500 or response.status_code == 429
+            observe((time.monotonic() - started) * 1000, error=failed)
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                logger.warning(f"Payments service returned {response.status_code} for {path}, retrying")
+                continue
+            self._record(not failed)
+            return response
+
+
+def count(name, amount=1):
+    try:
+        key = f"{METRICS_PREFIX}{name}"
+        if not cache.add(key, amount, timeout=None):
+            cache.incr(key, amount)
+    except Exception as e:  # metrics must never break a payment
+        logger.debug(f"Could not record payments metric {name}: {str(e)}")
+
+
+def observe(latency_ms, error=False):
+    count('requests')
+    if error:
+        count('errors')
+    count('latency_ms_sum', int(latency_ms))
+    bucket = next((le for le in LATENCY_BUCKETS_MS if latency_ms <= le), 'inf')
+    count(f"latency_le_{bucket}")
+
+
+def metrics():
+    """Counters across all processes, with a cumulative latency histogram in milliseconds."""
+    names = ['requests', 'errors', 'retries', 'rejected', 'latency_ms_sum']
+    buckets = [f"latency_le_{le}" for le in LATENCY_BUCKETS_MS + ('inf',)]
+    values = cache.get_many([f"{METRICS_PREFIX}{name}" for name in names + buckets])
+    value = lambda name: values.get(f"{METRICS_PREFIX}{name}", 0)
+
+    histogram, running = {}, 0
+    for le, name in zip(LATENCY_BUCKETS_MS + ('inf',), buckets):
+        running += value(name)
+        histogram[str(le)] = running
+    requests_made = value('requests')
+    return {
+        'requests': requests_made,
+        'errors': value('errors'),
+        'retries': value('retries'),
+        'circuit_rejections': value('rejected'),
+        'mean_latency_ms': round(value('latency_ms_sum') / requests_made, 1) if requests_made else 0.0,
+        'latency_ms_histogram': histogram,
+        'circuit_open': not payments_client.available(),
+    }
+
+
+payments_client = PaymentsClient(
+    settings.PAYMENTS_API_URL,
+    timeout=settings.PAYMENTS_API_TIMEOUT,
+    retries=settings.PAYMENTS_API_RETRIES,
+    failure_threshold=settings.PAYMENTS_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.PAYMENTS_CIRCUIT_RESET_TIMEOUT,
+    pool_size=settings.PAYMENTS_API_POOL_SIZE,
+)
@@ -0,0 +1,168 @@
+import json
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class FakePaymentsProvider:
+    """In-process stand-in for the payments service, for offline load tests.
+
+    Serves POST /api/v1/payments/process/ like the hosted service: each
+    request waits ``latency`` seconds (plus up to ``jitter``), fails with 503
+    at ``error_rate``, and otherwise accepts the payment and, after
+    ``callback_delay`` seconds, posts a PAID or (at ``failure_rate``) FAILED
+    callback to ``callback_url``. At ``duplicate_rate`` the callback is sent
+    twice, as M-Pesa does on retries. Callbacks carry parking_transaction_id,
+    so they are only sent for ``park-<id>`` orders. POST
+    /api/v1/payments/status/ reports the state of known orders in bulk.
+    """
+
+    def __init__(self, callback_url, latency=0.2, jitter=0.1, error_rate=0.0, callback_delay=2.0,
+                 failure_rate=0.0, duplicate_rate=0.0, seed=None):
+        self.callback_url = callback_url
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.callback_delay = callback_delay
+        self.failure_rate = failure_rate
+        self.duplicate_rate = duplicate_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.orders = {}
+        self.stats = {'requests': 0, 'errors': 0, 'accepted': 0, 'duplicates': 0, 'callbacks': 0, 'callback_errors': 0}
+        self.started = time.monotonic()
+        self.session = requests.Session()
+
+    def chance(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def count(self, name):
+        with self.lock:
+            self.stats[name] += 1
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        with self.lock:
+            stats = dict(self.stats)
+        stats['elapsed_seconds'] = round(elapsed, 1)
+        stats['requests_per_second'] = round(stats['requests'] / elapsed, 1) if elapsed else 0.0
+        return stats
+
+    def process(self, payload):
+        """Handle one payment request; returns (http status, response body)."""
+        self.count('requests')
+        time.sleep(self.latency + self.random.uniform(0, self.jitter))
+        if self.chance(self.error_rate):
+            self.count('errors')
+            return 503, {'status': 'error', 'message': 'Service temporarily unavailable'}
+
+        order_id = payload.get('order_id')
+        if not order_id or not payload.get('amount') or not payload.get('phone_number'):
+            return 400, {'status': 'error', 'message': 'order_id, amount and phone_number are required'}
+
+        with self.lock:
+            existing = self.orders.get(order_id)
+            if existing is None:
+                checkout_request_id = f"ws_CO_{uuid.uuid4().hex[:20]}"
+                self.orders[order_id] = {'status': 'PENDING', 'checkout_request_id': checkout_request_id, 'payload': payload}
+        if existing is not None:
+            # Same order id (the idempotency key): acknowledge without a second STK push
+            self.count('duplicates')
+            return 200, {
+                'status': 'success',
+                'message': 'STK push already sent',
+                'order_id': order_id,
+                'checkout_request_id': existing['checkout_request_id'],
+            }
+        self.count('accepted')
+
+        match = re.match(r'^park-(\d+)$', order_id)
+        if match:
+            timer = threading.Timer(self.callback_delay, self.complete, (order_id, int(match.group(1))))
+            timer.daemon = True
+            timer.start()
+        return 200, {
+            'status': 'success',
+            'message': 'STK push sent',
+            'order_id': order_id,
+            'checkout_request_id': checkout_request_id,
+        }
+
+    def status(self, payload):
+        """Bulk status lookup: {"order_ids": [...]} -> {"payments": [{"order_id", "status", ...}]}."""
+        time.sleep(self.latency + self.random.uniform(0, self.jitter))
+        payments = []
+        with self.lock:
+            for order_id in payload.get('order_ids') or []:
+                order = self.orders.get(order_id)
+                payments.append({
+                    'order_id': order_id,
+                    'status': order['status'] if order else 'NOT_FOUND',
+                    'mpesa_transaction_id': order.get('mpesa_transaction_id', '') if order else '',
+                })
+        return 200, {'status': 'success', 'payments': payments}
+
+    def complete(self, order_id, parking_transaction_id):
+        failed = self.chance(self.failure_rate)
+        callback = {
+            'parking_transaction_id': parking_transaction_id,
+            'status': 'FAILED' if failed else 'PAID',
+            'mpesa_transaction_id': '' if failed else uuid.uuid4().hex[:10].upper(),
+            'order_id': order_id,
+        }
+        with self.lock:
+            self.orders[order_id]['status'] = callback['status']
+            self.orders[order_id]['mpesa_transaction_id'] = callback['mpesa_transaction_id']
+
+        for _ in range(2 if self.chance(self.duplicate_rate) else 1):
+            try:
+                response = self.session.post(self.callback_url, json=callback, timeout=10)
+                self.count('callbacks')
+                logger.info(f"Callback for {order_id} ({callback['status']}) -> {response.status_code}")
+            except requests.exceptions.RequestException as e:
+                self.count('callback_errors')
+                logger.error(f"Callback for {order_id} failed: {str(e)}")
+
+    def handler(self):
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the hosted service
+
+            def respond(self, code, body):
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                routes = {'/api/v1/payments/process': provider.process, '/api/v1/payments/status': provider.status}
+                route = routes.get(self.path.rstrip('/'))
+                if route is None:
+                    return self.respond(404, {'status': 'error', 'message': 'Not found'})
+                try:
+                    payload = json.loads(body or b'{}')
+                except ValueError:
+                    return self.respond(400, {'status': 'error', 'message': 'Invalid JSON'})
+                self.respond(*route(payload))
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def serve(self, host='127.0.0.1', port=8001):
+        """Build the HTTP server; call serve_forever() on it (e.g. in a daemon thread for tests)."""
+        return ThreadingHTTPServer((host, port), self.handler())
@@ -0,0 +1,85 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from parking_transactions.kpis import invalidate_transactions
+from payments.models import PaymentCallback
+
+logger = logging.getLogger(__name__)
+
+# Payment states only move forward; PAID is final and a late FAILED or PENDING is ignored
+STATUS_RANK = {'PENDING': 0, 'FAILED': 1, 'PAID': 2}
+SESSION_STATUS = {'PAID': 'completed', 'FAILED': 'failed'}
+
+
+def apply_status(parking_txn, payment_status, mpesa_transaction_id=''):
+    """Move a transaction to ``payment_status`` if that is a step forward; returns whether it changed.
+
+    Only sets the fields; the caller saves (or bulk-updates) payment_status,
+    mpesa_transaction_id and status.
+    """
+    if STATUS_RANK.get(payment_status, -1) <= STATUS_RANK.get(parking_txn.payment_status, -1):
+        return False
+    parking_txn.payment_status = payment_status
+    parking_txn.mpesa_transaction_id = mpesa_transaction_id or parking_txn.mpesa_transaction_id
+    parking_txn.status = SESSION_STATUS.get(payment_status, parking_txn.status)
+    return True
+
+
+def record_callback(data):
+    """Store a callback for the worker; duplicates of one already stored are dropped."""
+    PaymentCallback.objects.bulk_create([
+        PaymentCallback(
+            parking_transaction_id=int(data['parking_transaction_id']),
+            status=data['status'],
+            mpesa_transaction_id=data.get('mpesa_transaction_id') or '',
+            payload=data,
+        )
+    ], ignore_conflicts=True)
+
+
+def apply_pending(batch_size=None):
+    """Apply a batch of stored callbacks to their parking transactions; returns how many were processed.
+
+    Callbacks are claimed with SKIP LOCKED so several workers can share the
+    inbox, their transactions are locked and loaded in one query, and all
+    changes are written back with bulk_update. Dashboards of the lots whose
+    sessions changed are marked stale once the batch commits.
+    """
+    from parking_transactions.models import ParkingTransaction
+
+    with transaction.atomic():
+        callbacks = list(
+            PaymentCallback.objects.select_for_update(skip_locked=True).filter(
+                processed_at__isnull=True
+            ).order_by('id')[:batch_size or settings.PAYMENT_CALLBACK_BATCH_SIZE]
+        )
+        if not callbacks:
+            return 0
+
+        parking_txns = ParkingTransaction.objects.select_for_update().in_bulk(
+            {callback.parking_transaction_id for callback in callbacks}
+        )
+        changed = {}
+        now = timezone.now()
+        for callback in callbacks:
+            callback.processed_at = now
+            parking_txn = parking_txns.get(callback.parking_transaction_id)
+            if parking_txn is None:
+                callback.result = 'unknown'
+                logger.error(f"Transaction not found for payment callback: {callback.parking_transaction_id}")
+                continue
+            if not apply_status(parking_txn, callback.status, callback.mpesa_transaction_id):
+                callback.result = 'stale'
+                continue
+
+            changed[parking_txn.id] = parking_txn
+            callback.result = 'applied'
+            logger.info(f"Payment status updated for transaction {parking_txn.id}: {callback.status}")
+
+        ParkingTransaction.objects.bulk_update(changed.values(), ['payment_status', 'mpesa_transaction_id', 'status'])
+        PaymentCallback.objects.bulk_update(callbacks, ['processed_at', 'result'])
+        invalidate_transactions(changed.values())
+    return len(callbacks)
@@ -0,0 +1,27 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments.outbox import dispatch_pending
+
+
+class Command(BaseCommand):
+    help = "Send queued payment requests from the payment outbox, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Send what is due and exit")
+        parser.add_argument('--interval', type=float, default=settings.PAYMENT_OUTBOX_POLL_INTERVAL,
+                            help="Seconds to wait between polls when the outbox is empty")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+        while True:
+            sent = dispatch_pending()
+            if options['once']:
+                self.stdout.write(f"Dispatched {sent} payment request(s)")
+                return
+            if not sent:
+                time.sleep(options['interval'])
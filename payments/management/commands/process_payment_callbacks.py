@@ -0,0 +1,29 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments.inbox import apply_pending
+
+
+class Command(BaseCommand):
+    help = "Apply stored payment status callbacks to parking transactions, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Apply what is stored and exit")
+        parser.add_argument('--interval', type=float, default=settings.PAYMENT_CALLBACK_POLL_INTERVAL,
+                            help="Seconds to wait between polls when the inbox is empty")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+        while True:
+            processed = apply_pending()
+            if options['once']:
+                self.stdout.write(f"Processed {processed} payment callback(s)")
+                if not processed:
+                    return
+                continue
+            if not processed:
+                time.sleep(options['interval'])
@@ -0,0 +1,31 @@
+import json
+import logging
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+
+from payments.reconcile import reconcile_pending, resolve_unknown
+
+
+class Command(BaseCommand):
+    help = ("Settle PENDING payments whose callback never arrived, and payment requests that timed out, "
+            "by polling the payments service in bulk.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, help="Transactions per status request")
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Keep running, reconciling every this many seconds (default: once)")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+        while True:
+            try:
+                unknown = resolve_unknown(options['chunk_size'])
+                self.stdout.write(json.dumps({**reconcile_pending(options['chunk_size']), 'unknown_requests': unknown}))
+            except requests.exceptions.RequestException as e:
+                self.stderr.write(f"Payments service unavailable, reconciliation stopped: {str(e)}")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,49 @@
+import json
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments.fake_provider import FakePaymentsProvider
+
+
+class Command(BaseCommand):
+    help = ("Run a local stand-in for the payments service for load tests. "
+            "Point PAYMENTS_API_URL at it, e.g. PAYMENTS_API_URL=http://127.0.0.1:8001.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--callback-url', default=f"{settings.PAYMENT_CALLBACK_URL.rstrip('/')}/api/payment-status/",
+                            help="Where payment status callbacks are posted")
+        parser.add_argument('--latency', type=float, default=0.2, help="Seconds each request takes")
+        parser.add_argument('--jitter', type=float, default=0.1, help="Up to this many extra seconds per request")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with 503")
+        parser.add_argument('--callback-delay', type=float, default=2.0, help="Seconds until the callback is sent")
+        parser.add_argument('--failure-rate', type=float, default=0.0, help="Share of payments that end FAILED")
+        parser.add_argument('--duplicate-rate', type=float, default=0.0, help="Share of callbacks sent twice")
+        parser.add_argument('--seed', type=int, help="Seed for reproducible runs")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+        provider = FakePaymentsProvider(
+            options['callback_url'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            callback_delay=options['callback_delay'],
+            failure_rate=options['failure_rate'],
+            duplicate_rate=options['duplicate_rate'],
+            seed=options['seed'],
+        )
+        server = provider.serve(options['host'], options['port'])
+        self.stdout.write(f"Fake payments service on http://{options['host']}:{options['port']}, "
+                          f"callbacks to {options['callback_url']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(json.dumps(provider.report()))
@@ -0,0 +1,36 @@
+import logging
+from datetime import datetime, time
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.settlement import settle
+
+
+class Command(BaseCommand):
+    help = ("Settle paid parking sessions into client and central tills. "
+            "Run daily; by default settles everything that exited before today (local time).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', help="Settle sessions that exited before this local date (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+        period_end = None
+        if options['until']:
+            try:
+                until = datetime.strptime(options['until'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--until must be a date in YYYY-MM-DD format")
+            period_end = datetime.combine(until, time.min, tzinfo=ZoneInfo(settings.LOCAL_TIME_ZONE))
+
+        run = settle(period_end)
+        if run is None:
+            self.stdout.write("Nothing to settle")
+        else:
+            self.stdout.write(
+                f"Settlement {run.id}: {run.transactions} transaction(s), gross {run.gross}, "
+                f"cyyks {run.cyyks_share}, clients {run.client_share}"
+            )
@@ -31,3 +31,127 @@ class ParkingTransaction(models.Model):
 
     def __str__(self):
         return f"{self.user} - {self.vehicle_number} - {self.payment_status}"
+
+
+class PaymentOutbox(models.Model):
+    """
+    Payment requests waiting to be sent to the payments service. Rows are
+    written in the same database transaction as the state change that
+    needs the payment and sent afterwards by the dispatch_payments worker,
+    so no request ever holds a transaction open across the HTTP call.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('unknown', 'Outcome unknown'),  # timed out after sending; settled by `manage.py reconcile_payments`
+        ('failed', 'Failed'),
+    ]
+
+    parking_transaction = models.ForeignKey(
+        'parking_transactions.ParkingTransaction', on_delete=models.CASCADE, null=True, blank=True,
+        related_name='payment_requests'
+    )
+    order_id = models.CharField(max_length=100, unique=True)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    response = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.order_id} - {self.status}"
+
+
+class PaymentCallback(models.Model):
+    """
+    Inbox of payment status callbacks. The callback endpoint only inserts a
+    row and acknowledges; the process_payment_callbacks worker applies them
+    to parking transactions in batches. Provider retries of the same
+    callback collide on the unique constraint and are dropped on insert.
+    """
+    RESULT_CHOICES = [
+        ('applied', 'Applied'),
+        ('stale', 'Stale'),  # would move the payment backwards, e.g. FAILED after PAID
+        ('unknown', 'Unknown transaction'),
+    ]
+
+    parking_transaction_id = models.BigIntegerField()
+    status = models.CharField(max_length=20)
+    mpesa_transaction_id = models.CharField(max_length=50, blank=True, default='')
+    payload = models.JSONField()
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    result = models.CharField(max_length=20, choices=RESULT_CHOICES, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['parking_transaction_id', 'mpesa_transaction_id', 'status'], name='unique_payment_callback'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True), name='unprocessed_callback_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.parking_transaction_id} - {self.status}"
+
+
+class CentralTill(models.Model):
+    """The platform's (Cyyks) share of settled parking fees. A single row, see get()."""
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def get(cls):
+        till, _ = cls.objects.get_or_create(id=1)
+        return till
+
+    def __str__(self):
+        return f"Central till: {self.balance}"
+
+
+class ClientTill(models.Model):
+    """A client's share of settled parking fees at their lots."""
+    client = models.OneToOneField(User, on_delete=models.CASCADE, related_name='till')
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.client.email} till: {self.balance}"
+
+
+class Settlement(models.Model):
+    """
+    One settlement run: every completed, paid session that exited before
+    period_end and was not settled yet (see payments.settlement).
+    """
+    period_end = models.DateTimeField()
+    transactions = models.PositiveIntegerField(default=0)
+    gross = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cyyks_share = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    client_share = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Settlement {self.id} up to {self.period_end}"
+
+
+class SettlementLine(models.Model):
+    """A settlement's totals for one client and local business day."""
+    settlement = models.ForeignKey(Settlement, on_delete=models.CASCADE, related_name='lines')
+    client = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='settlement_lines')
+    date = models.DateField()
+    transactions = models.PositiveIntegerField()
+    gross = models.DecimalField(max_digits=14, decimal_places=2)
+    cyyks_share = models.DecimalField(max_digits=14, decimal_places=2)
+    client_share = models.DecimalField(max_digits=14, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.client} {self.date}: {self.client_share}"
@@ -0,0 +1,121 @@
+import logging
+import random
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from parking_transactions.kpis import invalidate_transactions
+from payments.client import CircuitOpenError, payments_client
+from payments.models import PaymentOutbox
+
+logger = logging.getLogger(__name__)
+
+# Provider responses worth retrying; any other 4xx is final
+RETRY_STATUSES = {408, 409, 425, 429}
+
+
+def enqueue_payment(order_id, payload, parking_transaction=None):
+    """Queue a payment request; call inside the transaction that makes the payment due."""
+    outbox, _ = PaymentOutbox.objects.get_or_create(
+        order_id=order_id,
+        defaults={'payload': payload, 'parking_transaction': parking_transaction},
+    )
+    return outbox
+
+
+def retry_delay(attempts):
+    """Exponential backoff with full jitter, capped at PAYMENT_OUTBOX_MAX_DELAY seconds."""
+    return random.uniform(0, min(settings.PAYMENT_OUTBOX_MAX_DELAY, 2 ** attempts))
+
+
+def claim_due(batch_size):
+    """Lease a batch of due requests.
+
+    Rows are locked with SKIP LOCKED so several dispatchers can run side by
+    side, and pushed into the future before the lock is released so a
+    dispatcher that dies mid-send only delays them.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            PaymentOutbox.objects.select_for_update(skip_locked=True).filter(
+                status='pending', next_attempt_at__lte=now
+            ).order_by('next_attempt_at')[:batch_size]
+        )
+        lease_until = now + timedelta(seconds=settings.PAYMENTS_API_TIMEOUT * 2)
+        PaymentOutbox.objects.filter(id__in=[outbox.id for outbox in batch]).update(next_attempt_at=lease_until)
+    return batch
+
+
+def send(outbox):
+    """POST one request to the payments service and record the outcome on the row.
+
+    The order id goes along as the provider's idempotency key. Only
+    connection failures and statuses the provider did not act on are
+    resent; a read timeout (or any other failure after the request may have
+    been received) leaves the row 'unknown' for reconcile_payments to look
+    up, and only a definitive 4xx rejection fails the session's payment.
+    """
+    from parking_transactions.models import ParkingTransaction
+
+    try:
+        response = payments_client.post("/api/v1/payments/process/", outbox.payload, idempotency_key=outbox.order_id)
+    except CircuitOpenError:
+        # Nothing was sent, so this does not use up an attempt
+        outbox.next_attempt_at = timezone.now() + timedelta(seconds=payments_client.reset_timeout)
+        outbox.save(update_fields=['next_attempt_at'])
+        return
+    except requests.exceptions.ConnectionError as e:
+        body, error, retryable, rejected = None, str(e), True, False
+    except requests.exceptions.RequestException as e:
+        outbox.attempts += 1
+        outbox.status = 'unknown'
+        outbox.last_error = str(e)
+        outbox.next_attempt_at = timezone.now() + timedelta(seconds=settings.PAYMENT_RECONCILE_AFTER)
+        logger.warning(f"Payment request {outbox.order_id} outcome unknown, leaving it to reconciliation: {str(e)}")
+        outbox.save(update_fields=['attempts', 'status', 'next_attempt_at', 'last_error'])
+        return
+    else:
+        try:
+            body = response.json()
+        except ValueError:
+            body = {'text': response.text}
+        error = None if response.status_code < 400 else f"HTTP {response.status_code}: {body}"
+        retryable = response.status_code >= 500 or response.status_code in RETRY_STATUSES
+        rejected = error is not None and not retryable
+
+    outbox.attempts += 1
+    outbox.response = body
+    if error is None:
+        outbox.status = 'sent'
+        outbox.sent_at = timezone.now()
+        outbox.last_error = ''
+        logger.info(f"Payment request {outbox.order_id} sent after {outbox.attempts} attempt(s)")
+    elif retryable and outbox.attempts < settings.PAYMENT_OUTBOX_MAX_ATTEMPTS:
+        outbox.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(outbox.attempts))
+        outbox.last_error = error
+        logger.warning(f"Payment request {outbox.order_id} failed (attempt {outbox.attempts}), will retry: {error}")
+    else:
+        outbox.status = 'failed'
+        outbox.last_error = error
+        logger.error(f"Payment request {outbox.order_id} failed permanently: {error}")
+        # A transport failure may still have reached the provider; reconciliation settles those sessions
+        if rejected and outbox.parking_transaction_id:
+            parking_txns = ParkingTransaction.objects.filter(id=outbox.parking_transaction_id)
+            if parking_txns.filter(payment_status='PENDING').update(payment_status='FAILED'):
+                invalidate_transactions(parking_txns.only('parking_space_id'))
+
+    outbox.save(update_fields=['attempts', 'status', 'next_attempt_at', 'last_error', 'response', 'sent_at'])
+
+
+def dispatch_pending(batch_size=None):
+    """Send every request that is due; returns how many were attempted."""
+    if not payments_client.available():
+        return 0  # leave due requests alone instead of spending their attempts
+    batch = claim_due(batch_size or settings.PAYMENT_OUTBOX_BATCH_SIZE)
+    for outbox in batch:
+        send(outbox)
+    return len(batch)
@@ -0,0 +1,107 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from parking_transactions.kpis import invalidate_transactions
+from payments.client import payments_client
+from payments.inbox import apply_status
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_statuses(order_ids):
+    """Ask the payments service about many orders at once; returns {order_id: (status, mpesa_transaction_id)}."""
+    response = payments_client.post(settings.PAYMENTS_STATUS_PATH, {'order_ids': order_ids})
+    response.raise_for_status()
+    return {
+        payment['order_id']: (payment['status'], payment.get('mpesa_transaction_id') or '')
+        for payment in response.json().get('payments', [])
+    }
+
+
+def resolve_unknown(chunk_size=None):
+    """Look up payment requests whose send timed out, once PAYMENT_RECONCILE_AFTER has passed.
+
+    Requests the provider has on record are marked sent (their callback or
+    reconcile_pending settles the session); requests it never saw go back
+    to the outbox to be dispatched again under the same order id. Returns
+    counts per outcome.
+    """
+    from payments.models import PaymentOutbox
+
+    chunk_size = chunk_size or settings.PAYMENT_RECONCILE_CHUNK_SIZE
+    totals = {'checked': 0, 'sent': 0, 'requeued': 0}
+    last_id = 0
+    while True:
+        chunk = list(PaymentOutbox.objects.filter(
+            status='unknown', next_attempt_at__lte=timezone.now(), id__gt=last_id
+        ).order_by('id').values_list('id', 'order_id')[:chunk_size])
+        if not chunk:
+            return totals
+        last_id = chunk[-1][0]
+        statuses = fetch_statuses([order_id for _, order_id in chunk])
+        seen = {order_id for order_id, (payment_status, _) in statuses.items() if payment_status != 'NOT_FOUND'}
+        known = [outbox_id for outbox_id, order_id in chunk if order_id in seen]
+        unseen = [outbox_id for outbox_id, order_id in chunk if order_id not in seen]
+        totals['sent'] += PaymentOutbox.objects.filter(id__in=known, status='unknown').update(
+            status='sent', sent_at=timezone.now(), last_error=''
+        )
+        totals['requeued'] += PaymentOutbox.objects.filter(id__in=unseen, status='unknown').update(
+            status='pending', next_attempt_at=timezone.now()
+        )
+        totals['checked'] += len(chunk)
+
+
+def reconcile_pending(chunk_size=None):
+    """Settle sessions whose payment is still PENDING because a callback never arrived.
+
+    Completed sessions that have been PENDING for PAYMENT_RECONCILE_AFTER
+    are walked in primary-key order (keyset pagination, so each chunk is an
+    index range scan however large the table), their status is fetched from
+    the provider one chunk per request, and the changes are written back
+    with bulk_update. Orders the provider never saw are marked FAILED once
+    they are PAYMENT_RECONCILE_EXPIRE_AFTER old. Top-ups are skipped: their
+    order ids are not derivable from the row. Returns counts per outcome.
+    """
+    from parking_transactions.models import ParkingTransaction
+
+    chunk_size = chunk_size or settings.PAYMENT_RECONCILE_CHUNK_SIZE
+    now = timezone.now()
+    settle_before = now - timedelta(seconds=settings.PAYMENT_RECONCILE_AFTER)
+    expire_before = now - timedelta(seconds=settings.PAYMENT_RECONCILE_EXPIRE_AFTER)
+    pending = ParkingTransaction.objects.filter(
+        payment_status='PENDING', status='completed', exit_time__lte=settle_before
+    )
+
+    totals = {'checked': 0, 'paid': 0, 'failed': 0, 'expired': 0}
+    last_id = 0
+    while True:
+        chunk = list(pending.filter(id__gt=last_id).order_by('id').values_list('id', 'exit_time')[:chunk_size])
+        if not chunk:
+            return totals
+        last_id = chunk[-1][0]
+        statuses = fetch_statuses([f"park-{txn_id}" for txn_id, _ in chunk])
+
+        updates = {}
+        for txn_id, exit_time in chunk:
+            payment_status, mpesa_transaction_id = statuses.get(f"park-{txn_id}", ('NOT_FOUND', ''))
+            if payment_status in ('PAID', 'FAILED'):
+                updates[txn_id] = (payment_status, mpesa_transaction_id, payment_status.lower())
+            elif payment_status == 'NOT_FOUND' and exit_time <= expire_before:
+                updates[txn_id] = ('FAILED', '', 'expired')
+
+        with transaction.atomic():
+            changed = []
+            for parking_txn in ParkingTransaction.objects.select_for_update().filter(id__in=updates):
+                payment_status, mpesa_transaction_id, outcome = updates[parking_txn.id]
+                if apply_status(parking_txn, payment_status, mpesa_transaction_id):
+                    changed.append(parking_txn)
+                    totals[outcome] += 1
+            ParkingTransaction.objects.bulk_update(changed, ['payment_status', 'mpesa_transaction_id', 'status'])
+            invalidate_transactions(changed)
+
+        totals['checked'] += len(chunk)
+        logger.info(f"Reconciled {len(chunk)} pending payment(s) up to transaction {last_id}, {len(changed)} settled")
@@ -0,0 +1,94 @@
+import logging
+from datetime import datetime, time
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Round, TruncDate
+from django.utils import timezone
+
+from payments.models import CentralTill, ClientTill, Settlement, SettlementLine
+
+logger = logging.getLogger(__name__)
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+CENT = Decimal('0.01')
+
+
+def start_of_today():
+    time_zone = ZoneInfo(settings.LOCAL_TIME_ZONE)
+    return datetime.combine(timezone.now().astimezone(time_zone).date(), time.min, tzinfo=time_zone)
+
+
+def settle(period_end=None):
+    """Settle every completed, paid and not yet settled session that exited before ``period_end``.
+
+    Runs as a fixed number of statements whatever the traffic:
+    - one UPDATE claims the sessions for the run and writes their
+      cyyks_share/client_share split (CYYKS_COMMISSION_RATE, rounded to cents);
+    - one grouped query totals them per client and local business day;
+    - one bulk insert of settlement lines, then an F() update per till.
+    Runs are serialised on the central till's row lock, all in one
+    transaction. Returns the Settlement, or None if there was nothing to settle.
+    """
+    from parking_transactions.models import ParkingTransaction
+
+    period_end = period_end or start_of_today()
+    rate = Value(settings.CYYKS_COMMISSION_RATE, output_field=MONEY)
+    cyyks_share = Round(F('fee') * rate, 2, output_field=MONEY)
+
+    with transaction.atomic():
+        central = CentralTill.get()
+        CentralTill.objects.select_for_update().get(id=central.id)  # one settlement run at a time
+        run = Settlement.objects.create(period_end=period_end)
+
+        claimed = ParkingTransaction.objects.filter(
+            payment_status='PAID', status='completed', settlement__isnull=True,
+            exit_time__lt=period_end, fee__isnull=False
+        ).update(settlement=run, cyyks_share=cyyks_share, client_share=F('fee') - cyyks_share)
+        if not claimed:
+            run.delete()
+            return None
+
+        rows = ParkingTransaction.objects.filter(settlement=run).values(
+            client_id=F('parking_space__parking_lot__client_id'),
+            date=TruncDate('exit_time', tzinfo=ZoneInfo(settings.LOCAL_TIME_ZONE)),
+        ).annotate(
+            transactions=Count('id'),
+            gross=Sum('fee'),
+            cyyks_share=Sum('cyyks_share'),
+            client_share=Sum('client_share'),
+        ).order_by()
+        lines = [
+            SettlementLine(
+                settlement=run, client_id=row['client_id'], date=row['date'], transactions=row['transactions'],
+                gross=row['gross'].quantize(CENT), cyyks_share=row['cyyks_share'].quantize(CENT),
+                client_share=row['client_share'].quantize(CENT),
+            ) for row in rows
+        ]
+        SettlementLine.objects.bulk_create(lines)
+
+        per_client = {}
+        for line in lines:
+            per_client[line.client_id] = per_client.get(line.client_id, Decimal('0.00')) + line.client_share
+        if None in per_client:
+            logger.warning(f"Settlement {run.id}: {per_client[None]} from lots without a client not credited to any till")
+        per_client.pop(None, None)
+        ClientTill.objects.bulk_create([ClientTill(client_id=client_id) for client_id in per_client], ignore_conflicts=True)
+        for client_id, amount in per_client.items():
+            ClientTill.objects.filter(client_id=client_id).update(balance=F('balance') + amount, updated_at=timezone.now())
+
+        run.transactions = sum(line.transactions for line in lines)
+        run.gross = sum((line.gross for line in lines), Decimal('0.00'))
+        run.cyyks_share = sum((line.cyyks_share for line in lines), Decimal('0.00'))
+        run.client_share = sum((line.client_share for line in lines), Decimal('0.00'))
+        run.save(update_fields=['transactions', 'gross', 'cyyks_share', 'client_share'])
+        CentralTill.objects.filter(id=central.id).update(balance=F('balance') + run.cyyks_share, updated_at=timezone.now())
+
+    logger.info(
+        f"Settlement {run.id}: {run.transactions} transactions, gross {run.gross}, "
+        f"cyyks {run.cyyks_share}, clients {run.client_share} across {len(per_client)} client(s)"
+    )
+    return run
@@ -1,6 +1,13 @@
 from django.contrib import admin
 
-from users.models import User
+from users.models import BalanceLedger, BalanceSnapshot, User
+
+
+class UserAdmin(admin.ModelAdmin):
+    readonly_fields = ('balance',)  # changed only through users.ledger.post_entry
+
 
 # Register your models here.
-admin.site.register(User)
+admin.site.register(User, UserAdmin)
+admin.site.register(BalanceLedger)
+admin.site.register(BalanceSnapshot)
@@ -0,0 +1,27 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.ledger import reconcile_ledgers, take_snapshots
+
+
+class Command(BaseCommand):
+    help = "Snapshot user balances from the balance ledger so balance-as-of queries stay cheap. Run periodically."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Keep running, taking snapshots every this many seconds (default: once)")
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+        while True:
+            reconciled = reconcile_ledgers()
+            if reconciled:
+                self.stdout.write(f"Posted opening or adjustment entries for {reconciled} user(s) out of step with their ledger")
+            taken = take_snapshots()
+            self.stdout.write(f"Took {taken} balance snapshot(s)")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
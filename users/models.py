@@ -52,6 +52,22 @@ class User(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        """Write every column but ``balance`` on updates; balances change only through users.ledger.post_entry.
+
+        A full save() from a copy loaded before a concurrent top-up would
+        otherwise put the old balance back and leave the ledger out of step.
+        A starting balance given on creation is recorded as an opening entry.
+        """
+        adding = self._state.adding
+        if not adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.name != 'balance'
+            ]
+        super().save(*args, **kwargs)
+        if adding and self.balance:
+            BalanceLedger.objects.create(user=self, amount=self.balance, kind='opening')
+
     def set_otp(self, raw_otp):
         """Set the OTP with hashing."""
         self.otp = make_password(raw_otp)
@@ -59,4 +75,41 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def check_otp(self, raw_otp):
         """Check the OTP against the stored hashed value."""
-        return check_password(raw_otp, self.otp) if self.otp else False
\ No newline at end of file
+        return check_password(raw_otp, self.otp) if self.otp else False
+
+class BalanceLedger(models.Model):
+    """
+    Append-only record of every change to a user's balance. User.balance is
+    the running total of these entries; change it only through
+    users.ledger.post_entry so the two never disagree.
+    """
+    KIND_CHOICES = [
+        ('opening', 'Opening balance'),
+        ('topup', 'Top-up'),
+        ('adjustment', 'Adjustment'),
+    ]
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_entries')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)  # negative for debits
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    reference = models.CharField(max_length=64, blank=True)  # e.g. payment order id
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.user.email}: {self.amount} ({self.kind})"
+
+
+class BalanceSnapshot(models.Model):
+    """A user's balance as of a point in time, so balance-as-of queries only sum entries after it."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balance_snapshots')
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    as_of = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'as_of')
+        indexes = [models.Index(fields=['user', 'as_of'])]
+
+    def __str__(self):
+        return f"{self.user.email}: {self.balance} as of {self.as_of}"